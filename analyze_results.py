@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 from typing import Dict
+from result_store import load_results
 
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (12, 8)
@@ -11,10 +12,13 @@ plt.rcParams['figure.figsize'] = (12, 8)
 
 class ResultsAnalyzer:
     
+    COLUMNS = ['file_path', 'duration', 'snr_db', 'silence_ratio', 'clipping_ratio',
+               'zero_crossing_rate', 'rms_energy', 'dynamic_range_db', 'quality_score',
+               'is_accepted', 'rejection_reasons']
+    
     def __init__(self, results_path: str):
         self.results_path = Path(results_path)
-        self.df = pd.read_csv(self.results_path / "filtering_results.csv")
-        self.df['rejection_reasons'] = self.df['rejection_reasons'].fillna('')
+        self.df = load_results(self.results_path, columns=self.COLUMNS)
         
     def generate_summary_statistics(self) -> Dict:
         stats = {}
@@ -0,0 +1,111 @@
+import io
+import os
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from itertools import groupby
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+
+MEMBER_SEP = '::'
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.zip')
+AUDIO_SUFFIXES = ('.wav', '.mp3', '.flac', '.ogg')
+
+
+@dataclass
+class ArchiveMember:
+    name: str
+    data: bytes
+    info: Union[tarfile.TarInfo, zipfile.ZipInfo]
+
+
+def is_archive(path: str) -> bool:
+    return MEMBER_SEP not in path and path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_audio_member(name: str) -> bool:
+    return name.lower().endswith(AUDIO_SUFFIXES)
+
+
+def member_path(archive_path: str, member: str) -> str:
+    return f"{archive_path}{MEMBER_SEP}{member}"
+
+
+def split_member_path(path: str) -> Tuple[str, Optional[str]]:
+    archive_path, sep, member = path.partition(MEMBER_SEP)
+    return archive_path, member if sep else None
+
+
+def sample_key(member: str) -> str:
+    # WebDataset groups the files of one sample by name up to the first dot
+    # of the base name, e.g. shard/0001.wav and shard/0001.json
+    directory, slash, base = member.rpartition('/')
+    return directory + slash + base.split('.', 1)[0]
+
+
+def iter_members(archive_path: str, audio_only: bool = True) -> Iterator[ArchiveMember]:
+    # Regular files in archive order. Tar shards, compressed or not, are
+    # read as a stream and never seeked; skipped members are not read.
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and (not audio_only or is_audio_member(info.filename)):
+                    yield ArchiveMember(info.filename, archive.read(info), info)
+        return
+    
+    with tarfile.open(archive_path, 'r|*') as archive:
+        for info in archive:
+            if info.isfile() and (not audio_only or is_audio_member(info.name)):
+                yield ArchiveMember(info.name, archive.extractfile(info).read(), info)
+
+
+def iter_samples(archive_path: str) -> Iterator[List[ArchiveMember]]:
+    # Runs of adjacent members with the same sample key
+    members = iter_members(archive_path, audio_only=False)
+    for _, sample in groupby(members, key=lambda member: sample_key(member.name)):
+        yield list(sample)
+
+
+def read_member(path: str) -> bytes:
+    # One member by its archive::member path; tar archives are scanned up
+    # to it, so this is for occasional lookups rather than bulk reading
+    archive_path, name = split_member_path(path)
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            return archive.read(name)
+    
+    with tarfile.open(archive_path, 'r:*') as archive:
+        return archive.extractfile(name).read()
+
+
+class FilteredArchiveWriter:
+    # Copies members to a new archive of the same kind as output_path. It is
+    # written under a temporary name and renamed by commit(), so an
+    # interrupted run never leaves a truncated shard behind.
+    
+    def __init__(self, output_path: str):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.output_path.with_name(self.output_path.name + '.tmp')
+        name = self.output_path.name.lower()
+        if name.endswith('.zip'):
+            self._archive = zipfile.ZipFile(self.tmp_path, 'w')
+        else:
+            self._archive = tarfile.open(self.tmp_path, 'w:gz' if name.endswith(('.tar.gz', '.tgz')) else 'w')
+        self.n_members = 0
+    
+    def add(self, member: ArchiveMember):
+        if isinstance(self._archive, zipfile.ZipFile):
+            self._archive.writestr(member.info, member.data)
+        else:
+            self._archive.addfile(member.info, io.BytesIO(member.data))
+        self.n_members += 1
+    
+    def commit(self):
+        self._archive.close()
+        os.replace(self.tmp_path, self.output_path)
+    
+    def discard(self):
+        self._archive.close()
+        self.tmp_path.unlink(missing_ok=True)
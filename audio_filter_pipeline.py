@@ -2,12 +2,30 @@ import numpy as np
 import librosa
 import soundfile as sf
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, Optional, Union
 import json
 import csv
-from dataclasses import dataclass, asdict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import io
+import math
+import os
+import zlib
+import textwrap
+from array import array
+from contextlib import ExitStack
+from dataclasses import dataclass, asdict, field, fields
+from enum import IntFlag
+from functools import cached_property
+from itertools import chain, islice
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 from tqdm import tqdm
+from metrics_cache import MetricsCache
+from result_store import ResultWriter, ParquetResultWriter, iter_shards, json_safe, remove_unselected_results
+from profiling import StageTimer, StageStats, NULL_TIMER, profile_call
+from prefetch import Prefetcher
+from shared_ring import RingSlot, SharedRing
+from archive_reader import (FilteredArchiveWriter, is_archive, is_audio_member, iter_members,
+                            iter_samples, member_path, read_member, split_member_path)
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -28,30 +46,556 @@ class AudioMetrics:
     quality_score: float
     is_accepted: bool
     rejection_reasons: List[str]
+    # 'full'; 'triage' for sampled estimates or 'early_exit' when analysis
+    # stopped at a certain rejection. Metrics not computed are NaN.
+    analysis_tier: str = 'full'
+
+
+METRIC_NAMES = [
+    'snr_db', 'silence_ratio', 'clipping_ratio', 'zero_crossing_rate',
+    'spectral_centroid_mean', 'spectral_rolloff_mean', 'rms_energy', 'dynamic_range_db',
+]
+
+
+@dataclass
+class SegmentMetrics:
+    file_path: str
+    start_sec: float
+    end_sec: float
+    duration: float
+    snr_db: float
+    silence_ratio: float
+    clipping_ratio: float
+    zero_crossing_rate: float
+    spectral_centroid_mean: float
+    spectral_rolloff_mean: float
+    rms_energy: float
+    dynamic_range_db: float
+    quality_score: float
+    is_accepted: bool
+    rejection_reasons: List[str]
+
+
+class RejectionReason(IntFlag):
+    LOW_SNR = 1 << 0
+    TOO_MUCH_SILENCE = 1 << 1
+    CLIPPING = 1 << 2
+    LOW_ENERGY = 1 << 3
+    LOW_DYNAMIC_RANGE = 1 << 4
+    TOO_SHORT = 1 << 5
+    TOO_LONG = 1 << 6
+    NOT_ANALYZED = 1 << 7
+    PROCESSING_ERROR = 1 << 8
+    INCOMPLETE = 1 << 9
+
+
+REASON_TEMPLATES = [
+    (RejectionReason.LOW_SNR, 'snr_db', "Low SNR: {:.2f} dB"),
+    (RejectionReason.TOO_MUCH_SILENCE, 'silence_ratio', "Too much silence: {:.2%}"),
+    (RejectionReason.CLIPPING, 'clipping_ratio', "Clipping detected: {:.2%}"),
+    (RejectionReason.LOW_ENERGY, 'rms_energy', "Low energy: {:.4f}"),
+    (RejectionReason.LOW_DYNAMIC_RANGE, 'dynamic_range_db', "Low dynamic range: {:.2f} dB"),
+    (RejectionReason.TOO_SHORT, 'duration', "Too short: {:.2f}s"),
+    (RejectionReason.TOO_LONG, 'duration', "Too long: {:.2f}s"),
+    (RejectionReason.NOT_ANALYZED, None, "Not analyzed: duration now within range, re-run pipeline"),
+    (RejectionReason.PROCESSING_ERROR, None, "Processing error"),
+    (RejectionReason.INCOMPLETE, None, "Incomplete metrics: analysis stopped early, re-run pipeline"),
+]
+
+
+# Metric thresholds: 'min_' keys reject values below, 'max_' keys above
+THRESHOLD_CHECKS = [
+    (RejectionReason.LOW_SNR, 'snr_db', 'min_snr_db'),
+    (RejectionReason.TOO_MUCH_SILENCE, 'silence_ratio', 'max_silence_ratio'),
+    (RejectionReason.CLIPPING, 'clipping_ratio', 'max_clipping_ratio'),
+    (RejectionReason.LOW_ENERGY, 'rms_energy', 'min_rms_energy'),
+    (RejectionReason.LOW_DYNAMIC_RANGE, 'dynamic_range_db', 'min_dynamic_range_db'),
+]
+
+
+REASON_FLAGS = {template.split(':')[0]: flag for flag, _, template in REASON_TEMPLATES}
+
+
+def reason_mask(reasons: List[str]) -> int:
+    mask = 0
+    for reason in reasons:
+        mask |= REASON_FLAGS.get(reason.split(':')[0], 0)
+    return int(mask)
+
+
+RESAMPLERS = ('soxr_vhq', 'soxr_hq', 'soxr_mq', 'soxr_lq', 'soxr_qq', 'polyphase')
+
+
+@dataclass
+class BatchScores:
+    # Scores and rejection bitmasks for a table of files. Reason strings are
+    # only formatted when asked for, from the metric columns they refer to.
+    quality_score: np.ndarray
+    rejection_mask: np.ndarray
+    columns: Dict[str, np.ndarray]
+    details: Dict[int, List[str]] = field(default_factory=dict)
+    
+    def __len__(self) -> int:
+        return len(self.rejection_mask)
+    
+    @property
+    def is_accepted(self) -> np.ndarray:
+        return self.rejection_mask == 0
+    
+    def reject(self, rows: np.ndarray, reason: RejectionReason, 
+               details: Optional[Dict[int, List[str]]] = None):
+        # Replaces any earlier verdict for the given rows, like the early
+        # returns in process_file
+        rows = np.asarray(rows)
+        rows = np.flatnonzero(rows) if rows.dtype == bool else rows.astype(np.intp)
+        self.rejection_mask[rows] = int(reason)
+        self.quality_score[rows] = 0.0
+        if self.details:
+            for idx in rows:
+                self.details.pop(int(idx), None)
+        if details:
+            self.details.update(details)
+    
+    def reasons(self, idx: int) -> List[str]:
+        if idx in self.details:
+            return list(self.details[idx])
+        
+        mask = int(self.rejection_mask[idx])
+        reasons = []
+        for flag, column, template in REASON_TEMPLATES:
+            if mask & flag:
+                reasons.append(template.format(self.columns[column][idx]) if column else template)
+        return reasons
+    
+    def reason_counts(self) -> Dict[str, int]:
+        counts = {}
+        for flag, _, template in REASON_TEMPLATES:
+            count = int(np.count_nonzero(self.rejection_mask & flag))
+            if count:
+                counts[template.split(':')[0]] = count
+        return counts
+
+
+def _sliding_sum(values: np.ndarray, width: int, step: int, count: int) -> np.ndarray:
+    total = np.zeros(count)
+    if count <= 0:
+        return total
+    span = (count - 1) * step + 1
+    for k in range(width):
+        total += values[k:k + span:step]
+    return total
+
+
+class FrameFeatures:
+    # Frame-level frontend shared by every metric in AudioQualityAnalyzer.
+    # The signal is reduced once to per-hop block sums (power and zero
+    # crossings) and transformed once by the STFT; frame-level envelopes
+    # matching librosa's centred framing are rebuilt from those blocks.
+    
+    def __init__(self, audio: np.ndarray, sr: int, frame_length: int = 2048, 
+                 hop_length: int = 512, clip_threshold: float = 0.99):
+        self.audio = audio
+        self.sr = sr
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.clip_threshold = clip_threshold
+        self.n_samples = len(audio)
+        self.n_frames = 1 + self.n_samples // hop_length
+    
+    @classmethod
+    def from_blocks(cls, sr: int, n_samples: int, frame_length: int, hop_length: int,
+                    clip_threshold: float, **blocks: np.ndarray) -> 'FrameFeatures':
+        # Features of a signal that is no longer (or never was) held in
+        # memory, from its block arrays and per-frame spectral values
+        features = cls(np.zeros(0, dtype=np.float32), sr, frame_length, hop_length, clip_threshold)
+        features.audio = None
+        features.n_samples = n_samples
+        features.n_frames = 1 + n_samples // hop_length
+        for name, values in blocks.items():
+            setattr(features, name, values)
+        return features
+    
+    def _blocks_align(self, frame_length: int, hop_length: int, offset: int = 0) -> bool:
+        hop = self.hop_length
+        return frame_length % hop == 0 and hop_length % hop == 0 and offset % hop == 0
+    
+    def _block_reduce(self, values: np.ndarray) -> np.ndarray:
+        hop = self.hop_length
+        n_full = len(values) // hop
+        blocks = values[:n_full * hop].reshape(n_full, hop)
+        if values.dtype == bool:
+            reduced = np.count_nonzero(blocks, axis=1).astype(np.float64)
+            tail = float(np.count_nonzero(values[n_full * hop:]))
+        else:
+            reduced = np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64)
+            tail = values[n_full * hop:].astype(np.float64)
+            tail = float(np.dot(tail, tail))
+        if len(values) > n_full * hop:
+            reduced = np.append(reduced, tail)
+        return reduced
+    
+    def _centred(self, blocks: np.ndarray) -> np.ndarray:
+        width = self.frame_length // self.hop_length
+        lead = (self.frame_length // 2) // self.hop_length
+        padded = np.zeros(self.n_frames - 1 + width)
+        padded[lead:lead + len(blocks)] = blocks
+        return _sliding_sum(padded, width, 1, self.n_frames)
+    
+    @cached_property
+    def block_power(self) -> np.ndarray:
+        return self._block_reduce(self.audio)
+    
+    @cached_property
+    def _crossings(self) -> np.ndarray:
+        # librosa's zero_crossings: samples within 1e-10 of zero count as positive
+        negative = self.audio < -1e-10
+        crossings = np.zeros(self.n_samples, dtype=bool)
+        crossings[1:] = negative[1:] != negative[:-1]
+        return crossings
+    
+    @cached_property
+    def block_crossings(self) -> np.ndarray:
+        return self._block_reduce(self._crossings)
+    
+    @cached_property
+    def block_start_crossings(self) -> np.ndarray:
+        return self._crossings[::self.hop_length].astype(np.float64)
+    
+    @cached_property
+    def block_clipped(self) -> np.ndarray:
+        return self._block_reduce(np.abs(self.audio) >= self.clip_threshold)
+    
+    @cached_property
+    def frame_power(self) -> np.ndarray:
+        if not self._blocks_align(self.frame_length, self.hop_length, self.frame_length // 2):
+            rms = librosa.feature.rms(y=self.audio, frame_length=self.frame_length,
+                                      hop_length=self.hop_length)[0]
+            return rms.astype(np.float64) ** 2
+        return self._centred(self.block_power) / self.frame_length
+    
+    @cached_property
+    def rms(self) -> np.ndarray:
+        return np.sqrt(self.frame_power)
+    
+    @cached_property
+    def zero_crossing_rate(self) -> np.ndarray:
+        if not self._blocks_align(self.frame_length, self.hop_length, self.frame_length // 2):
+            return librosa.feature.zero_crossing_rate(
+                self.audio, frame_length=self.frame_length, hop_length=self.hop_length)[0]
+        
+        # librosa edge-pads and counts crossings between consecutive samples
+        # inside each frame; edge padding adds none, and the crossing into a
+        # frame's first sample belongs to the previous frame.
+        counts = self._centred(self.block_crossings)
+        lead = (self.frame_length // 2) // self.hop_length
+        starts = self.block_start_crossings[:max(0, self.n_frames - lead)]
+        counts[lead:lead + len(starts)] -= starts
+        return counts / self.frame_length
+    
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        return np.abs(librosa.stft(self.audio, n_fft=self.frame_length, 
+                                   hop_length=self.hop_length))
+    
+    @cached_property
+    def spectral_centroid(self) -> np.ndarray:
+        return librosa.feature.spectral_centroid(S=self.magnitude, sr=self.sr)[0]
+    
+    @cached_property
+    def spectral_rolloff(self) -> np.ndarray:
+        return librosa.feature.spectral_rolloff(S=self.magnitude, sr=self.sr)[0]
+    
+    def clipped_samples(self, threshold: float) -> int:
+        if threshold == self.clip_threshold:
+            return int(np.sum(self.block_clipped))
+        if self.audio is None:
+            raise ValueError(f"Clipping was counted at {self.clip_threshold}, not {threshold}")
+        return int(np.sum(np.abs(self.audio) >= threshold))
+    
+    def segment(self, start: int, end: int) -> 'FrameFeatures':
+        # Features of audio[start:end] analyzed on its own, sliced from the
+        # block arrays. Boundaries must be hop-aligned (or the signal end),
+        # as split points from nonsilent_intervals are. Block statistics are
+        # exact; the spectral means use this signal's frames centred inside
+        # the segment, which differ from a standalone STFT only in the edge
+        # frames' padding.
+        hop = self.hop_length
+        if start % hop or (end % hop and end != self.n_samples):
+            raise ValueError(f"Segment [{start}, {end}) is not aligned to hop length {hop}")
+        first, last = start // hop, -(-end // hop)
+        n_samples = end - start
+        n_frames = 1 + n_samples // hop
+        
+        crossings = self.block_crossings[first:last].copy()
+        starts = self.block_start_crossings[first:last].copy()
+        if len(starts):
+            # The crossing into the segment's first sample lies outside it
+            crossings[0] -= starts[0]
+            starts[0] = 0
+        
+        return FrameFeatures.from_blocks(
+            self.sr, n_samples, self.frame_length, hop, self.clip_threshold,
+            block_power=self.block_power[first:last],
+            block_crossings=crossings,
+            block_start_crossings=starts,
+            block_clipped=self.block_clipped[first:last],
+            spectral_centroid=self.spectral_centroid[first:first + n_frames],
+            spectral_rolloff=self.spectral_rolloff[first:first + n_frames],
+        )
+    
+    def frame_energy(self, frame_length: int, hop_length: int) -> np.ndarray:
+        if frame_length > self.n_samples:
+            return np.zeros(0)
+        count = 1 + (self.n_samples - frame_length) // hop_length
+        if not self._blocks_align(frame_length, hop_length):
+            frames = librosa.util.frame(self.audio, frame_length=frame_length, 
+                                        hop_length=hop_length)
+            return np.einsum('ij,ij->j', frames, frames, dtype=np.float64)
+        return _sliding_sum(self.block_power, frame_length // self.hop_length,
+                            hop_length // self.hop_length, count)
+    
+    def nonsilent_intervals(self, top_db: float = 30) -> np.ndarray:
+        # Same interval logic as librosa.effects.split, on the shared RMS envelope
+        db = librosa.amplitude_to_db(self.rms, ref=np.max, top_db=None)
+        non_silent = db > -top_db
+        
+        edges = np.flatnonzero(np.diff(non_silent.astype(int))) + 1
+        if non_silent[0]:
+            edges = np.concatenate([[0], edges])
+        if non_silent[-1]:
+            edges = np.append(edges, len(non_silent))
+        
+        edges = np.minimum(edges * self.hop_length, self.n_samples)
+        return edges.reshape(-1, 2)
+
+
+class StreamingFrameFeatures(FrameFeatures):
+    # FrameFeatures built from a stream of sample blocks. Only the per-hop
+    # block sums and per-frame spectral values are kept (a few floats per
+    # hop), never the samples or the spectrogram, so long recordings are
+    # analyzed in bounded memory with the same results as the in-memory path.
+    
+    def __init__(self, sr: int, frame_length: int = 2048, hop_length: int = 512,
+                 clip_threshold: float = 0.99):
+        if frame_length % hop_length or (frame_length // 2) % hop_length:
+            raise ValueError("Streaming analysis needs frame_length to be a multiple of 2 * hop_length")
+        
+        super().__init__(np.zeros(0, dtype=np.float32), sr, frame_length, hop_length, clip_threshold)
+        self.audio = None
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._last_negative = None
+        self._power, self._counts, self._starts, self._clipped = [], [], [], []
+        self._centroid, self._rolloff = [], []
+        self._window = librosa.filters.get_window('hann', frame_length, fftbins=True)
+        self._stft_buffer = np.zeros(frame_length // 2, dtype=np.float32)
+        self._finished = False
+    
+    def _reduce_blocks(self, data: np.ndarray):
+        negative = data < -1e-10
+        crossings = np.empty(len(data), dtype=bool)
+        crossings[0] = self._last_negative is not None and negative[0] != self._last_negative
+        crossings[1:] = negative[1:] != negative[:-1]
+        self._last_negative = negative[-1]
+        
+        clipped = np.abs(data) >= self.clip_threshold
+        
+        hop = self.hop_length
+        n_full = len(data) // hop
+        blocks = data[:n_full * hop].reshape(-1, hop)
+        self._power.append(np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64))
+        self._counts.append(np.count_nonzero(crossings[:n_full * hop].reshape(-1, hop), axis=1))
+        self._starts.append(crossings[:n_full * hop:hop].copy())
+        self._clipped.append(np.count_nonzero(clipped[:n_full * hop].reshape(-1, hop), axis=1))
+        
+        if len(data) > n_full * hop:
+            tail = data[n_full * hop:].astype(np.float64)
+            self._power.append(np.array([np.dot(tail, tail)]))
+            self._counts.append(np.array([np.count_nonzero(crossings[n_full * hop:])]))
+            self._starts.append(crossings[n_full * hop:n_full * hop + 1].copy())
+            self._clipped.append(np.array([np.count_nonzero(clipped[n_full * hop:])]))
+    
+    def _transform_frames(self, final: bool = False):
+        buffer = self._stft_buffer
+        if final:
+            buffer = np.concatenate([buffer, np.zeros(self.frame_length // 2, dtype=buffer.dtype)])
+        if len(buffer) < self.frame_length:
+            self._stft_buffer = buffer
+            return
+        
+        frames = librosa.util.frame(buffer, frame_length=self.frame_length, hop_length=self.hop_length)
+        # Same arithmetic as librosa.stft: float64 window, complex64 output
+        S = np.abs(np.fft.rfft(self._window[:, None] * frames, axis=0).astype(np.complex64))
+        self._centroid.append(librosa.feature.spectral_centroid(S=S, sr=self.sr)[0])
+        self._rolloff.append(librosa.feature.spectral_rolloff(S=S, sr=self.sr)[0])
+        self._stft_buffer = buffer[frames.shape[1] * self.hop_length:]
+    
+    def update(self, block: np.ndarray):
+        if len(block) == 0:
+            return
+        self.n_samples += len(block)
+        
+        data = np.concatenate([self._pending, block])
+        usable = len(data) - len(data) % self.hop_length
+        if usable:
+            self._reduce_blocks(data[:usable])
+        self._pending = data[usable:]
+        
+        self._stft_buffer = np.concatenate([self._stft_buffer, block])
+        self._transform_frames()
+    
+    def finish(self) -> 'StreamingFrameFeatures':
+        if self._finished:
+            return self
+        if len(self._pending):
+            self._reduce_blocks(self._pending)
+            self._pending = self._pending[:0]
+        self._transform_frames(final=True)
+        
+        self.n_frames = 1 + self.n_samples // self.hop_length
+        self.block_power = np.concatenate(self._power) if self._power else np.zeros(0)
+        self.block_crossings = (np.concatenate(self._counts).astype(np.float64) 
+                                if self._counts else np.zeros(0))
+        self.block_start_crossings = (np.concatenate(self._starts).astype(np.float64) 
+                                      if self._starts else np.zeros(0))
+        self.block_clipped = (np.concatenate(self._clipped).astype(np.float64) 
+                              if self._clipped else np.zeros(0))
+        self.spectral_centroid = np.concatenate(self._centroid) if self._centroid else np.zeros(0)
+        self.spectral_rolloff = np.concatenate(self._rolloff) if self._rolloff else np.zeros(0)
+        self._power = self._counts = self._starts = self._clipped = None
+        self._centroid = self._rolloff = None
+        self._finished = True
+        return self
+
+
+class OnlineSNR:
+    # Bounded-memory variant of AudioQualityAnalyzer.compute_snr for sample
+    # streams. Frame energies go into a fixed histogram of 0.01 dB bins
+    # holding counts and energy sums, instead of being kept. The noise
+    # frames are the same lowest tenth as in snr_from_energy; only the ones
+    # sharing the threshold's bin are averaged as a fraction of that bin,
+    # which keeps the result within about 0.02 dB of compute_snr.
+    
+    BINS_PER_DECADE = 1000
+    MIN_DECADE, MAX_DECADE = -20, 5
+    
+    def __init__(self, frame_length: int = 2048):
+        self.hop = frame_length // 2
+        # Bin 0 takes zero and smaller energies, the last bin larger ones
+        n_bins = (self.MAX_DECADE - self.MIN_DECADE) * self.BINS_PER_DECADE + 2
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.sums = np.zeros(n_bins)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._last_power = None
+    
+    def update(self, block: np.ndarray):
+        # Frames of frame_length at a half-frame hop are pairs of
+        # consecutive half-frame blocks
+        data = np.concatenate([self._pending, block])
+        n_full = len(data) // self.hop
+        self._pending = data[n_full * self.hop:]
+        if n_full == 0:
+            return
+        
+        blocks = data[:n_full * self.hop].reshape(n_full, self.hop)
+        power = np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64)
+        if self._last_power is not None:
+            power = np.concatenate([[self._last_power], power])
+        self._last_power = power[-1]
+        self.add_energies(power[:-1] + power[1:])
+    
+    def add_energies(self, energy: np.ndarray):
+        index = np.floor((np.log10(np.maximum(energy, 1e-300)) - self.MIN_DECADE) * self.BINS_PER_DECADE)
+        index = np.clip(index, -1, len(self.counts) - 2).astype(np.int64) + 1
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        self.sums += np.bincount(index, weights=energy, minlength=len(self.sums))
+    
+    def snr(self) -> float:
+        n = int(self.counts.sum())
+        if n == 0:
+            return -np.inf
+        if n == 1:
+            return 0.0
+        
+        # Noise frames are the floor((n - 1) / 10) + 1 lowest energies
+        n_noise = int((n - 1) * 0.1) + 1
+        cumulative = np.cumsum(self.counts)
+        edge = int(np.searchsorted(cumulative, n_noise))
+        if edge == 0:
+            # A floor of digital silence: every tied frame is noise
+            n_noise = int(self.counts[0])
+        taken = (n_noise - (cumulative[edge] - self.counts[edge])) / self.counts[edge]
+        noise_sum = float(self.sums[:edge].sum()) + taken * self.sums[edge]
+        signal_sum = float(self.sums[edge + 1:].sum()) + (1 - taken) * self.sums[edge]
+        
+        if n_noise == n:
+            return 0.0
+        
+        noise_power = noise_sum / n_noise
+        signal_power = signal_sum / (n - n_noise)
+        
+        if noise_power == 0:
+            return 50.0
+        
+        return float(10 * np.log10(signal_power / noise_power))
 
 
 class AudioQualityAnalyzer:
     
+    # Bump whenever a metric definition changes so cached metrics are recomputed
+    VERSION = '2'
+    
     def __init__(self, sr: int = 16000):
         self.sr = sr
+        # Replaced by a StageTimer when per-stage profiling is enabled
+        self.timer = NULL_TIMER
+    
+    def frame_features(self, audio: np.ndarray) -> FrameFeatures:
+        return FrameFeatures(audio, self.sr)
         
-    def compute_snr(self, audio: np.ndarray, frame_length: int = 2048) -> float:
-        hop_length = frame_length // 2
-        frames = librosa.util.frame(audio, frame_length=frame_length, hop_length=hop_length)
-        energy = np.sum(frames ** 2, axis=0)
-        
-        if len(energy) == 0:
+    def compute_snr(self, audio: np.ndarray, frame_length: int = 2048,
+                    features: Optional[FrameFeatures] = None) -> float:
+        features = features or self.frame_features(audio)
+        energy = features.frame_energy(frame_length, frame_length // 2)
+        return self.snr_from_energy(energy)
+    
+    @staticmethod
+    def snr_from_energy(energy: np.ndarray) -> float:
+        # Noise is the frames at or below the 10th percentile of frame
+        # energy and signal the rest. One partial sort around the two order
+        # statistics np.percentile interpolates between gives the same
+        # threshold and split; the means differ from np.mean of the masked
+        # frames only in summation order, i.e. in the last bits.
+        n = len(energy)
+        if n == 0:
             return -np.inf
+        if n == 1:
+            return 0.0
+        
+        position = (n - 1) * 0.1
+        lower = int(position)
+        upper = lower + 1
+        ordered = np.partition(energy, (lower, upper))
+        low, high = float(ordered[lower]), float(ordered[upper])
+        # np.percentile's linear interpolation, rounding included
+        gamma = position - lower
+        diff = high - low
+        threshold = high - diff * (1 - gamma) if gamma >= 0.5 else low + diff * gamma
         
-        noise_threshold = np.percentile(energy, 10)
-        noise_frames = energy[energy <= noise_threshold]
-        signal_frames = energy[energy > noise_threshold]
+        noise_sum, n_noise = float(np.sum(ordered[:upper])), upper
+        signal = ordered[upper:]
+        if threshold >= high:
+            # Frames tied with the threshold count as noise
+            ties = signal <= threshold
+            n_ties = int(np.count_nonzero(ties))
+            noise_sum += float(np.sum(signal[ties]))
+            n_noise += n_ties
+            signal = signal[~ties]
         
-        if len(noise_frames) == 0 or len(signal_frames) == 0:
+        if len(signal) == 0:
             return 0.0
         
-        noise_power = np.mean(noise_frames)
-        signal_power = np.mean(signal_frames)
+        noise_power = noise_sum / n_noise
+        signal_power = float(np.sum(signal)) / len(signal)
         
         if noise_power == 0:
             return 50.0
@@ -59,62 +603,198 @@ class AudioQualityAnalyzer:
         snr = 10 * np.log10(signal_power / noise_power)
         return float(snr)
     
-    def compute_silence_ratio(self, audio: np.ndarray, top_db: int = 30) -> float:
-        non_silent_intervals = librosa.effects.split(audio, top_db=top_db)
+    def compute_snr_online(self, blocks: Iterable[np.ndarray], frame_length: int = 2048) -> float:
+        # compute_snr over a stream of sample blocks in fixed memory
+        estimator = OnlineSNR(frame_length)
+        for block in blocks:
+            estimator.update(block)
+        return estimator.snr()
+    
+    def compute_silence_ratio(self, audio: np.ndarray, top_db: int = 30,
+                              features: Optional[FrameFeatures] = None) -> float:
+        features = features or self.frame_features(audio)
+        non_silent_intervals = features.nonsilent_intervals(top_db=top_db)
         
         if len(non_silent_intervals) == 0:
             return 1.0
         
         non_silent_duration = sum(end - start for start, end in non_silent_intervals)
-        silence_ratio = 1.0 - (non_silent_duration / len(audio))
+        silence_ratio = 1.0 - (non_silent_duration / features.n_samples)
         
         return float(max(0.0, min(1.0, silence_ratio)))
     
-    def compute_clipping_ratio(self, audio: np.ndarray, threshold: float = 0.99) -> float:
-        clipped_samples = np.sum(np.abs(audio) >= threshold)
-        clipping_ratio = clipped_samples / len(audio)
+    def compute_clipping_ratio(self, audio: np.ndarray, threshold: float = 0.99,
+                               features: Optional[FrameFeatures] = None) -> float:
+        features = features or self.frame_features(audio)
+        clipping_ratio = features.clipped_samples(threshold) / features.n_samples
         return float(clipping_ratio)
     
-    def compute_zero_crossing_rate(self, audio: np.ndarray) -> float:
-        zcr = librosa.feature.zero_crossing_rate(audio)[0]
-        return float(np.mean(zcr))
+    def compute_zero_crossing_rate(self, audio: np.ndarray,
+                                   features: Optional[FrameFeatures] = None) -> float:
+        features = features or self.frame_features(audio)
+        return float(np.mean(features.zero_crossing_rate))
     
-    def compute_spectral_features(self, audio: np.ndarray) -> Tuple[float, float]:
-        spectral_centroid = librosa.feature.spectral_centroid(y=audio, sr=self.sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=self.sr)[0]
-        
-        return float(np.mean(spectral_centroid)), float(np.mean(spectral_rolloff))
+    def compute_spectral_features(self, audio: np.ndarray,
+                                  features: Optional[FrameFeatures] = None) -> Tuple[float, float]:
+        features = features or self.frame_features(audio)
+        return float(np.mean(features.spectral_centroid)), float(np.mean(features.spectral_rolloff))
     
-    def compute_rms_energy(self, audio: np.ndarray) -> float:
-        rms = librosa.feature.rms(y=audio)[0]
-        return float(np.mean(rms))
+    def compute_rms_energy(self, audio: np.ndarray,
+                           features: Optional[FrameFeatures] = None) -> float:
+        features = features or self.frame_features(audio)
+        return float(np.mean(features.rms))
     
-    def compute_dynamic_range(self, audio: np.ndarray) -> float:
-        if len(audio) == 0:
+    def compute_dynamic_range(self, audio: np.ndarray,
+                              features: Optional[FrameFeatures] = None) -> float:
+        features = features or self.frame_features(audio)
+        if features.n_samples == 0:
             return 0.0
         
-        rms = librosa.feature.rms(y=audio)[0]
-        rms_db = librosa.amplitude_to_db(rms + 1e-10)
+        rms_db = librosa.amplitude_to_db(features.rms + 1e-10)
         
         dynamic_range = np.max(rms_db) - np.min(rms_db)
         return float(dynamic_range)
     
-    def analyze_audio(self, audio: np.ndarray) -> Dict[str, float]:
+    def analyze_features(self, features: FrameFeatures,
+                         should_stop: Optional[Callable[[Dict[str, float]], bool]] = None) -> Dict[str, float]:
+        # Metrics are computed cheapest first, thresholded ones before the
+        # zero crossing rate and the STFT-based spectral features. When
+        # should_stop returns True for the metrics so far, the rest are
+        # skipped. Frame features are computed lazily, so each shared
+        # envelope is timed under the first metric that needs it.
+        audio = features.audio
+        timer = self.timer
         metrics = {}
         
-        metrics['snr_db'] = self.compute_snr(audio)
-        metrics['silence_ratio'] = self.compute_silence_ratio(audio)
-        metrics['clipping_ratio'] = self.compute_clipping_ratio(audio)
-        metrics['zero_crossing_rate'] = self.compute_zero_crossing_rate(audio)
-        
-        spectral_centroid, spectral_rolloff = self.compute_spectral_features(audio)
-        metrics['spectral_centroid_mean'] = spectral_centroid
-        metrics['spectral_rolloff_mean'] = spectral_rolloff
+        steps = [
+            ('clipping', ('clipping_ratio',), self.compute_clipping_ratio),
+            ('rms', ('rms_energy',), self.compute_rms_energy),
+            ('dynamic_range', ('dynamic_range_db',), self.compute_dynamic_range),
+            ('snr', ('snr_db',), self.compute_snr),
+            ('silence', ('silence_ratio',), self.compute_silence_ratio),
+            ('zero_crossing', ('zero_crossing_rate',), self.compute_zero_crossing_rate),
+            ('spectral', ('spectral_centroid_mean', 'spectral_rolloff_mean'), self.compute_spectral_features),
+        ]
         
-        metrics['rms_energy'] = self.compute_rms_energy(audio)
-        metrics['dynamic_range_db'] = self.compute_dynamic_range(audio)
+        for stage, names, compute in steps:
+            with timer.stage(stage):
+                values = compute(audio, features=features)
+            if len(names) == 1:
+                metrics[names[0]] = values
+            else:
+                metrics.update(zip(names, values))
+            if should_stop is not None and should_stop(metrics):
+                break
         
         return metrics
+    
+    def estimate_metrics(self, windows: List[np.ndarray], confidence: float = 0.95,
+                         n_bootstrap: int = 64, rng: Optional[np.random.Generator] = None,
+                         top_db: float = 30) -> Dict[str, Tuple[float, float, float]]:
+        # Triage estimates (value, low, high) of the thresholded metrics from
+        # windows sampled across a file. Windows are the sampling unit, as
+        # frames within one are correlated; only frames lying wholly inside
+        # a window are used.
+        rng = rng or np.random.default_rng()
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        
+        energies, rms, clipped = [], [], []
+        for window in windows:
+            features = self.frame_features(window)
+            half = features.frame_length // 2
+            energies.append(features.frame_energy(features.frame_length, half))
+            rms.append(features.rms[half // features.hop_length:
+                                    (features.n_samples - half) // features.hop_length + 1])
+            clipped.append(features.clipped_samples(0.99) / max(1, features.n_samples))
+        
+        def mean_interval(values) -> Tuple[float, float, float]:
+            values = np.asarray(values, dtype=np.float64)
+            mean = float(np.mean(values))
+            if len(values) < 2:
+                return mean, -np.inf, np.inf
+            margin = z * float(np.std(values, ddof=1)) / np.sqrt(len(values))
+            return mean, mean - margin, mean + margin
+        
+        estimates = {}
+        
+        snr = self.snr_from_energy(np.concatenate(energies))
+        picks = rng.integers(0, len(windows), size=(n_bootstrap, len(windows)))
+        resampled = [self.snr_from_energy(np.concatenate([energies[i] for i in pick])) for pick in picks]
+        low, high = np.percentile(resampled, [50 * (1 - confidence), 50 * (1 + confidence)])
+        estimates['snr_db'] = (snr, float(min(low, snr)), float(max(high, snr)))
+        
+        # Silence is judged against the loudest sampled frame, as
+        # nonsilent_intervals judges it against the loudest frame overall
+        all_rms = np.concatenate(rms)
+        floor = max(1e-5, float(np.max(all_rms, initial=0.0))) * 10 ** (-top_db / 20)
+        estimates['silence_ratio'] = mean_interval(
+            [np.mean(np.maximum(values, 1e-5) <= floor) for values in rms])
+        estimates['clipping_ratio'] = mean_interval(clipped)
+        estimates['rms_energy'] = mean_interval([np.mean(values) for values in rms])
+        
+        # The sampled range can only widen with more frames, up to the 80 dB
+        # cap of amplitude_to_db
+        rms_db = librosa.amplitude_to_db(all_rms + 1e-10)
+        dynamic_range = float(np.max(rms_db) - np.min(rms_db))
+        estimates['dynamic_range_db'] = (dynamic_range, dynamic_range, 80.0)
+        
+        return estimates
+    
+    def analyze_audio(self, audio: np.ndarray) -> Dict[str, float]:
+        return self.analyze_features(self.frame_features(audio))
+    
+    def stream_features(self, blocks: Iterable[np.ndarray]) -> StreamingFrameFeatures:
+        features = StreamingFrameFeatures(self.sr)
+        for block in blocks:
+            with self.timer.stage('features'):
+                features.update(block)
+        with self.timer.stage('features'):
+            return features.finish()
+    
+    def analyze_stream(self, blocks: Iterable[np.ndarray]) -> Tuple[Dict[str, float], int]:
+        features = self.stream_features(blocks)
+        return self.analyze_features(features), features.n_samples
+    
+    def segment_intervals(self, features: FrameFeatures, top_db: float = 30,
+                          min_segment_sec: float = 1.0, max_segment_sec: float = 30.0,
+                          merge_gap_sec: float = 0.5) -> np.ndarray:
+        # Non-silent intervals with short pauses merged back in, long runs
+        # split into near-equal hop-aligned pieces, and fragments dropped
+        hop = features.hop_length
+        merge_gap = int(merge_gap_sec * self.sr)
+        min_length = int(min_segment_sec * self.sr)
+        max_length = max(hop, int(max_segment_sec * self.sr) // hop * hop)
+        
+        merged = []
+        for start, end in features.nonsilent_intervals(top_db):
+            if merged and start - merged[-1][1] <= merge_gap:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        
+        segments = []
+        for start, end in merged:
+            pieces = -(-(end - start) // max_length)
+            piece_length = -(-(end - start) // (pieces * hop)) * hop
+            bounds = [min(start + i * piece_length, end) for i in range(pieces + 1)]
+            segments.extend(
+                (s, e) for s, e in zip(bounds[:-1], bounds[1:]) if e - s >= min_length
+            )
+        
+        return np.array(segments, dtype=np.int64).reshape(-1, 2)
+    
+    def analyze_segments(self, features: FrameFeatures, **params) -> List[Dict]:
+        # Timed as one stage rather than per metric
+        timer, self.timer = self.timer, NULL_TIMER
+        try:
+            with timer.stage('segments'):
+                segments = []
+                for start, end in self.segment_intervals(features, **params):
+                    metrics = self.analyze_features(features.segment(int(start), int(end)))
+                    segments.append({'start': int(start), 'end': int(end), **metrics})
+                return segments
+        finally:
+            self.timer = timer
 
 
 class AudioFilterPipeline:
@@ -124,198 +804,946 @@ class AudioFilterPipeline:
         self.analyzer = AudioQualityAnalyzer(sr=config['sample_rate'])
         self.thresholds = config['thresholds']
         self.weights = config.get('weights', {})
+        self.cache = self.create_cache(config.get('cache'))
+        self.segmentation = self.segmentation_params(config.get('segmentation'))
+        triage = config.get('triage') or {}
+        self.triage = triage if triage.get('enabled') else None
+        decode_pool = config.get('decode_pool') or {}
+        self.decode_pool = decode_pool if decode_pool.get('enabled') else None
+        self.resampler = config.get('resampler', 'soxr_hq')
+        if self.resampler not in RESAMPLERS:
+            raise ValueError(f"Unknown resampler: {self.resampler}")
+        
+        # Decode, resample and total time are always tracked; profiling adds
+        # CPU time, every analysis stage and per-file records
+        profiling = config.get('profiling') or {}
+        self.profiling = profiling if profiling.get('enabled') else None
+        self.timer = StageTimer(cpu=self.profiling is not None)
+        if self.profiling:
+            self.analyzer.timer = self.timer
+        self.stats = self.create_stats()
+    
+    def create_cache(self, cache_config: Optional[Dict]) -> Optional[MetricsCache]:
+        if not cache_config or not cache_config.get('dir'):
+            return None
+        return MetricsCache(
+            cache_config['dir'],
+            analyzer_version=AudioQualityAnalyzer.VERSION,
+            sample_rate=self.config['sample_rate'],
+            max_size_mb=cache_config.get('max_size_mb', 1024),
+            key_mode=cache_config.get('key', 'stat'),
+        )
         
-    def load_audio(self, file_path: str) -> Tuple[np.ndarray, int]:
+    def create_stats(self) -> StageStats:
+        if not self.profiling:
+            return StageStats()
+        return StageStats(detailed=True, keep_slowest=self.profiling.get('profile_slowest', 0))
+    
+    def segmentation_params(self, seg_config: Optional[Dict]) -> Optional[Dict]:
+        if not seg_config or not seg_config.get('enabled'):
+            return None
+        return {key: value for key, value in seg_config.items() if key != 'enabled'}
+        
+    def load_audio(self, file_path: str, data: Optional[bytes] = None) -> Tuple[np.ndarray, int]:
         try:
-            audio, sr = librosa.load(file_path, sr=self.config['sample_rate'])
-            return audio, sr
+            with self.timer.stage('decode'):
+                audio, native_sr = self.decode_audio(file_path, data)
+            with self.timer.stage('resample'):
+                audio = self.resample(audio, native_sr)
+            return audio, self.config['sample_rate']
         except Exception as e:
             raise RuntimeError(f"Failed to load {file_path}: {e}")
     
-    def compute_quality_score(self, metrics: Dict[str, float]) -> float:
-        score = 0.0
+    def audio_source(self, file_path: str, data: Optional[bytes] = None):
+        # Prefetched bytes are decoded from memory; each reader gets its own
+        # file object over the same buffer
+        return io.BytesIO(data) if data is not None else file_path
+    
+    def decode_audio(self, file_path: str, data: Optional[bytes] = None) -> Tuple[np.ndarray, int]:
+        # Mono float32 at the file's native rate, read by soundfile directly;
+        # formats it cannot read go through librosa's audioread fallback
+        if Path(file_path).suffix.lstrip('.').upper() not in sf.available_formats():
+            return librosa.load(file_path, sr=None)
+        audio, sr = sf.read(self.audio_source(file_path, data), dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+        return audio, sr
+    
+    @property
+    def stream_resampler(self) -> str:
+        return 'soxr_mq' if self.resampler == 'polyphase' else self.resampler
+    
+    def cache_variant(self, streamed: bool) -> str:
+        # The resampler changes metric values, so cached entries are kept per
+        # resampler actually applied
+        return f"stream:{self.stream_resampler}" if streamed else self.resampler
+    
+    def resample(self, audio: np.ndarray, orig_sr: int) -> np.ndarray:
+        # Same output length as librosa.resample; soxr_hq is librosa's default
+        target_sr = self.config['sample_rate']
+        if orig_sr == target_sr:
+            return audio
         
-        snr = metrics['snr_db']
-        snr_score = min(30, max(0, (snr / 20) * 30))
-        score += snr_score * self.weights.get('snr', 0.3)
+        if self.resampler == 'polyphase':
+            from scipy.signal import resample_poly
+            gcd = np.gcd(orig_sr, target_sr)
+            resampled = resample_poly(audio, target_sr // gcd, orig_sr // gcd).astype(np.float32)
+        else:
+            import soxr
+            resampled = soxr.resample(audio, orig_sr, target_sr, quality=self.resampler)
         
-        silence_score = (1 - metrics['silence_ratio']) * 20
-        score += silence_score * self.weights.get('silence', 0.2)
+        return librosa.util.fix_length(resampled, size=int(np.ceil(len(audio) * target_sr / orig_sr)))
+    
+    def score_batch(self, table, check_duration: bool = False) -> BatchScores:
+        # Scores a columnar metrics table (DataFrame, dict of arrays, NumPy
+        # structured array or Arrow table) in one pass of array operations
+        names = ['snr_db', 'silence_ratio', 'clipping_ratio', 'rms_energy', 'dynamic_range_db']
+        if check_duration:
+            names.append('duration')
+        columns = {name: np.asarray(table[name], dtype=np.float64) for name in names}
         
-        clipping_score = (1 - min(1.0, metrics['clipping_ratio'] * 100)) * 20
-        score += clipping_score * self.weights.get('clipping', 0.2)
+        snr_score = np.clip((columns['snr_db'] / 20) * 30, 0, 30)
+        silence_score = (1 - columns['silence_ratio']) * 20
+        clipping_score = (1 - np.minimum(1.0, columns['clipping_ratio'] * 100)) * 20
+        dr_score = np.clip((columns['dynamic_range_db'] / 40) * 15, 0, 15)
+        rms_score = np.clip((columns['rms_energy'] / 0.1) * 15, 0, 15)
         
-        dr = metrics['dynamic_range_db']
-        dr_score = min(15, max(0, (dr / 40) * 15))
-        score += dr_score * self.weights.get('dynamic_range', 0.15)
+        score = (snr_score * self.weights.get('snr', 0.3) +
+                 silence_score * self.weights.get('silence', 0.2) +
+                 clipping_score * self.weights.get('clipping', 0.2) +
+                 dr_score * self.weights.get('dynamic_range', 0.15) +
+                 rms_score * self.weights.get('rms', 0.15))
         
-        rms = metrics['rms_energy']
-        rms_score = min(15, max(0, (rms / 0.1) * 15))
-        score += rms_score * self.weights.get('rms', 0.15)
+        mask = np.zeros(len(score), dtype=np.uint16)
+        for flag, name, key in THRESHOLD_CHECKS:
+            threshold = self.thresholds[key]
+            failed = columns[name] < threshold if key.startswith('min_') else columns[name] > threshold
+            mask |= np.where(failed, np.uint16(flag), np.uint16(0))
         
-        return score
-    
-    def check_thresholds(self, metrics: Dict[str, float]) -> Tuple[bool, List[str]]:
-        reasons = []
+        batch = BatchScores(quality_score=score, rejection_mask=mask, columns=columns)
         
-        if metrics['snr_db'] < self.thresholds['min_snr_db']:
-            reasons.append(f"Low SNR: {metrics['snr_db']:.2f} dB")
+        if check_duration:
+            duration = columns['duration']
+            batch.reject(duration > self.thresholds['max_duration_sec'], RejectionReason.TOO_LONG)
+            batch.reject(duration < self.thresholds['min_duration_sec'], RejectionReason.TOO_SHORT)
         
-        if metrics['silence_ratio'] > self.thresholds['max_silence_ratio']:
-            reasons.append(f"Too much silence: {metrics['silence_ratio']:.2%}")
+        return batch
+    
+    def stream_audio(self, file_path: str, native_sr: int, data: Optional[bytes] = None) -> Iterator[np.ndarray]:
+        # Mono float32 blocks at the target rate, decoded and resampled
+        # incrementally. soxr has no polyphase mode, so streamed files use
+        # its medium quality tier when polyphase is selected.
+        block_size = self.config.get('stream_block_size', 65536)
+        target_sr = self.config['sample_rate']
+        resampler = None
+        if native_sr != target_sr:
+            import soxr
+            resampler = soxr.ResampleStream(native_sr, target_sr, 1, dtype='float32', 
+                                            quality=self.stream_resampler)
         
-        if metrics['clipping_ratio'] > self.thresholds['max_clipping_ratio']:
-            reasons.append(f"Clipping detected: {metrics['clipping_ratio']:.2%}")
+        with sf.SoundFile(self.audio_source(file_path, data)) as f:
+            blocks = f.blocks(blocksize=block_size, dtype='float32', always_2d=True)
+            while True:
+                with self.timer.stage('decode'):
+                    block = next(blocks, None)
+                if block is None:
+                    break
+                mono = block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+                if resampler:
+                    with self.timer.stage('resample'):
+                        mono = resampler.resample_chunk(mono)
+                yield mono
         
-        if metrics['rms_energy'] < self.thresholds['min_rms_energy']:
-            reasons.append(f"Low energy: {metrics['rms_energy']:.4f}")
+        if resampler:
+            yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+    
+    def compute_quality_score(self, metrics: Dict[str, float]) -> float:
+        batch = self.score_batch({name: [value] for name, value in metrics.items()})
+        return float(batch.quality_score[0])
+    
+    def check_thresholds(self, metrics: Dict[str, float]) -> Tuple[bool, List[str]]:
+        batch = self.score_batch({name: [value] for name, value in metrics.items()})
+        return bool(batch.is_accepted[0]), batch.reasons(0)
+    
+    def probe_audio(self, file_path: str, data: Optional[bytes] = None) -> Optional[Tuple[float, int]]:
+        # Duration and native rate from the container header, without decoding
+        # samples. None means soundfile cannot parse this format and the
+        # caller should fall back to a full decode.
+        if Path(file_path).suffix.lstrip('.').upper() not in sf.available_formats():
+            return None
+        try:
+            info = sf.info(self.audio_source(file_path, data))
+        except Exception as e:
+            raise RuntimeError(f"Unreadable file {file_path}: {e}")
+        if info.samplerate <= 0:
+            raise RuntimeError(f"Unreadable file {file_path}: invalid sample rate")
+        return info.frames / info.samplerate, info.samplerate
+    
+    def rejected_metrics(self, file_path: str, duration: float, sample_rate: int,
+                         reason: str) -> AudioMetrics:
+        return AudioMetrics(
+            file_path=file_path,
+            duration=duration,
+            sample_rate=sample_rate,
+            snr_db=0, silence_ratio=0, clipping_ratio=0,
+            zero_crossing_rate=0, spectral_centroid_mean=0,
+            spectral_rolloff_mean=0, rms_energy=0, dynamic_range_db=0,
+            quality_score=0,
+            is_accepted=False,
+            rejection_reasons=[reason]
+        )
+    
+    def check_duration(self, file_path: str, duration: float, 
+                       sample_rate: int) -> Optional[AudioMetrics]:
+        if duration < self.thresholds['min_duration_sec']:
+            return self.rejected_metrics(file_path, duration, sample_rate,
+                                         f"Too short: {duration:.2f}s")
         
-        if metrics['dynamic_range_db'] < self.thresholds['min_dynamic_range_db']:
-            reasons.append(f"Low dynamic range: {metrics['dynamic_range_db']:.2f} dB")
+        if duration > self.thresholds['max_duration_sec']:
+            return self.rejected_metrics(file_path, duration, sample_rate,
+                                         f"Too long: {duration:.2f}s")
         
-        is_accepted = len(reasons) == 0
-        return is_accepted, reasons
+        return None
+    
+    def process_file(self, file_path: str, data: Optional[bytes] = None) -> AudioMetrics:
+        return self.process_file_segments(file_path, data)[0]
+    
+    def process_file_segments(self, file_path: str, data: Optional[bytes] = None,
+                              features: Optional[FrameFeatures] = None,
+                              use_cache: bool = True) -> Tuple[AudioMetrics, List[SegmentMetrics]]:
+        # data optionally holds the file's bytes, already read by a prefetcher;
+        # features those of its audio, already decoded elsewhere
+        with self.timer.stage('total'):
+            result = self.analyze_file(file_path, data, features, use_cache)
+        self.stats.add_file(file_path, self.timer.take())
+        return result
     
-    def process_file(self, file_path: str) -> AudioMetrics:
+    def process_decoded(self, file_path: str, audio: np.ndarray, sr: int) -> Tuple[AudioMetrics, List[SegmentMetrics]]:
+        # Audio already decoded in memory. file_path only names the result;
+        # nothing is read from it and the cache is not used.
         try:
-            audio, sr = self.load_audio(file_path)
-            duration = len(audio) / sr
+            audio = self.prepare_audio(audio, sr)
+        except Exception as e:
+            self.timer.take()
+            return self.rejected_metrics(file_path, 0, 0, f"Processing error: {str(e)}"), []
+        return self.process_file_segments(file_path, features=self.analyzer.frame_features(audio),
+                                          use_cache=False)
+    
+    def prepare_audio(self, audio: np.ndarray, sr: int) -> np.ndarray:
+        # Mono float32 at the pipeline rate from an array at any rate, shaped
+        # (samples,), soundfile's (samples, channels) or torchaudio's
+        # (channels, samples); the shorter axis is taken as channels. Integer
+        # PCM is scaled to [-1, 1) the way soundfile reads it.
+        audio = np.asarray(audio)
+        if audio.ndim > 2:
+            raise ValueError(f"Expected a 1-D or 2-D audio array, got shape {audio.shape}")
+        if np.issubdtype(audio.dtype, np.integer):
+            info = np.iinfo(audio.dtype)
+            half = (int(info.max) + 1) // 2 if info.min == 0 else -int(info.min)
+            offset = half if info.min == 0 else 0
+            audio = (audio.astype(np.float32) - offset) / np.float32(half)
+        elif not np.issubdtype(audio.dtype, np.floating):
+            raise ValueError(f"Unsupported audio dtype: {audio.dtype}")
+        audio = audio.astype(np.float32, copy=False)
+        if audio.ndim == 2:
+            channel_axis = 0 if audio.shape[0] < audio.shape[1] else 1
+            audio = audio.mean(axis=channel_axis, dtype=np.float32)
+        with self.timer.stage('resample'):
+            return self.resample(audio, sr)
+    
+    def decode_bytes(self, data: bytes) -> Tuple[np.ndarray, int]:
+        with self.timer.stage('decode'):
+            return sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    
+    def process_array(self, audio: np.ndarray, sr: int, name: str = '<array>') -> AudioMetrics:
+        return self.process_decoded(name, audio, sr)[0]
+    
+    def process_bytes(self, data: bytes, name: str = '<bytes>') -> AudioMetrics:
+        # An encoded file held in memory, in any format soundfile reads
+        try:
+            audio, sr = self.decode_bytes(data)
+        except Exception as e:
+            self.timer.take()
+            return self.rejected_metrics(name, 0, 0, f"Processing error: {str(e)}")
+        return self.process_array(audio, sr, name)
+    
+    def process_arrays(self, arrays: Iterable[np.ndarray], sample_rates: Union[int, Iterable[int]],
+                       names: Optional[Iterable[str]] = None) -> List[AudioMetrics]:
+        arrays = list(arrays)
+        sample_rates = [sample_rates] * len(arrays) if isinstance(sample_rates, int) else list(sample_rates)
+        names = list(names) if names is not None else [f"<array {i}>" for i in range(len(arrays))]
+        return [self.process_array(audio, sr, name) for audio, sr, name in zip(arrays, sample_rates, names)]
+    
+    def process_bytes_batch(self, blobs: Iterable[bytes], 
+                            names: Optional[Iterable[str]] = None) -> List[AudioMetrics]:
+        blobs = list(blobs)
+        names = list(names) if names is not None else [f"<bytes {i}>" for i in range(len(blobs))]
+        return [self.process_bytes(data, name) for data, name in zip(blobs, names)]
+    
+    def analyze_file(self, file_path: str, data: Optional[bytes] = None,
+                     features: Optional[FrameFeatures] = None,
+                     use_cache: bool = True) -> Tuple[AudioMetrics, List[SegmentMetrics]]:
+        detail = self.analyzer.timer
+        cache = self.cache if use_cache else None
+        try:
+            # Given features come from files that already passed decodes_whole()
+            prescan = self.config.get('header_prescan', True) and features is None
+            stream_from = self.config.get('stream_min_duration_sec', 60.0)
+            with detail.stage('probe'):
+                header = (self.probe_audio(file_path, data) 
+                          if features is None and (prescan or stream_from is not None) else None)
             
-            if duration < self.thresholds['min_duration_sec']:
-                return AudioMetrics(
-                    file_path=file_path,
-                    duration=duration,
-                    sample_rate=sr,
-                    snr_db=0, silence_ratio=0, clipping_ratio=0,
-                    zero_crossing_rate=0, spectral_centroid_mean=0,
-                    spectral_rolloff_mean=0, rms_energy=0, dynamic_range_db=0,
-                    quality_score=0,
-                    is_accepted=False,
-                    rejection_reasons=[f"Too short: {duration:.2f}s"]
-                )
+            if prescan and header is not None:
+                # Rows report the target rate, as for decoded files
+                rejected = self.check_duration(file_path, header[0], self.config['sample_rate'])
+                if rejected is not None and not self.segments_wanted(header[0]):
+                    return rejected, []
             
-            if duration > self.thresholds['max_duration_sec']:
-                return AudioMetrics(
-                    file_path=file_path,
-                    duration=duration,
-                    sample_rate=sr,
-                    snr_db=0, silence_ratio=0, clipping_ratio=0,
-                    zero_crossing_rate=0, spectral_centroid_mean=0,
-                    spectral_rolloff_mean=0, rms_energy=0, dynamic_range_db=0,
-                    quality_score=0,
-                    is_accepted=False,
-                    rejection_reasons=[f"Too long: {duration:.2f}s"]
-                )
+            streamed = header is not None and stream_from is not None and header[0] >= stream_from
+            with detail.stage('cache'):
+                cache_key = cache.file_key(file_path, data, self.cache_variant(streamed)) if cache else None
+                cached = cache.get(cache_key) if cache else None
+            if cached is not None and self.segmentation and cached.get('segmentation') != self.segmentation:
+                cached = None
             
-            metrics = self.analyzer.analyze_audio(audio)
-            quality_score = self.compute_quality_score(metrics)
-            is_accepted, rejection_reasons = self.check_thresholds(metrics)
+            if cached is None and self.triage and header is not None and not self.segmentation:
+                # Triage gives a verdict without decoding, so duration limits
+                # are checked here even without the prescan
+                rejected = self.check_duration(file_path, header[0], self.config['sample_rate'])
+                if rejected is not None and not self.segments_wanted(header[0]):
+                    return rejected, []
+                with detail.stage('triage'):
+                    metrics = self.triage_file(file_path, *header, data=data)
+                if metrics is not None:
+                    return self.scored_metrics(file_path, header[0], self.config['sample_rate'],
+                                               metrics, analysis_tier='triage'), []
             
-            return AudioMetrics(
-                file_path=file_path,
-                duration=duration,
-                sample_rate=sr,
-                quality_score=quality_score,
-                is_accepted=is_accepted,
-                rejection_reasons=rejection_reasons,
-                **metrics
-            )
+            if cached is not None:
+                duration, sr, metrics = cached['duration'], cached['sample_rate'], cached['metrics']
+                segments = cached.get('segments', [])
+            else:
+                if features is not None:
+                    sr = features.sr
+                elif streamed:
+                    features = self.analyzer.stream_features(self.stream_audio(file_path, header[1], data))
+                    sr = self.config['sample_rate']
+                else:
+                    audio, sr = self.load_audio(file_path, data)
+                    features = self.analyzer.frame_features(audio)
+                duration = features.n_samples / sr
+            
+            rejected = self.check_duration(file_path, duration, sr)
+            if rejected is not None and not self.segments_wanted(duration):
+                return rejected, []
+            
+            if cached is None:
+                # Segments need every metric, so there is no early exit for them
+                early_exit = self.config.get('early_exit', False) and not self.segmentation
+                metrics = self.analyzer.analyze_features(
+                    features, should_stop=self.fails_thresholds if early_exit else None)
+                if len(metrics) < len(METRIC_NAMES):
+                    # Rejection is already certain; partial metrics are not cached
+                    metrics = {name: metrics.get(name, np.nan) for name in METRIC_NAMES}
+                    result = self.scored_metrics(file_path, duration, sr, metrics, analysis_tier='early_exit')
+                    result.quality_score = 0.0
+                    return result, []
+                segments = (self.analyzer.analyze_segments(features, **self.segmentation) 
+                            if self.segmentation else [])
+                if cache:
+                    entry = {'duration': duration, 'sample_rate': sr, 'metrics': metrics}
+                    if self.segmentation:
+                        entry.update(segmentation=self.segmentation, segments=segments)
+                    cache.put(cache_key, entry)
+            
+            with detail.stage('score'):
+                segment_results = self.score_segments(file_path, segments, sr)
+                if rejected is not None:
+                    return rejected, segment_results
+                
+                return self.scored_metrics(file_path, duration, sr, metrics), segment_results
             
         except Exception as e:
-            return AudioMetrics(
+            return self.rejected_metrics(file_path, 0, 0, f"Processing error: {str(e)}"), []
+    
+    def scored_metrics(self, file_path: str, duration: float, sr: int, metrics: Dict[str, float],
+                       analysis_tier: str = 'full') -> AudioMetrics:
+        batch = self.score_batch({name: [value] for name, value in metrics.items()})
+        
+        return AudioMetrics(
+            file_path=file_path,
+            duration=duration,
+            sample_rate=sr,
+            quality_score=float(batch.quality_score[0]),
+            is_accepted=bool(batch.is_accepted[0]),
+            rejection_reasons=batch.reasons(0),
+            analysis_tier=analysis_tier,
+            **metrics
+        )
+    
+    def triage_file(self, file_path: str, duration: float, native_sr: int,
+                    data: Optional[bytes] = None) -> Optional[Dict[str, float]]:
+        # Metric estimates from a sample of windows when the verdict is clear
+        # at the configured confidence; None means run the full analysis.
+        # Zero crossing rate and spectral features are not estimated.
+        params = self.triage
+        # Windows hold at least a few whole 2048-sample analysis frames
+        window_sec = max(params.get('window_sec', 1.0), 4 * 2048 / self.config['sample_rate'])
+        n_windows = max(params.get('min_windows', 8),
+                        math.ceil(params.get('sample_fraction', 0.1) * duration / window_sec))
+        if n_windows * window_sec > 0.5 * duration:
+            return None
+        
+        # Seeded per file so reruns sample the same windows
+        rng = np.random.default_rng([params.get('seed', 0), zlib.crc32(file_path.encode())])
+        windows = self.read_windows(file_path, native_sr, n_windows, window_sec, rng, data)
+        estimates = self.analyzer.estimate_metrics(
+            windows, confidence=params.get('confidence', 0.95),
+            n_bootstrap=params.get('bootstrap', 64), rng=rng)
+        
+        if not self.triage_is_clear(estimates):
+            return None
+        
+        metrics = {name: value for name, (value, _, _) in estimates.items()}
+        metrics.update(zero_crossing_rate=np.nan, spectral_centroid_mean=np.nan,
+                       spectral_rolloff_mean=np.nan)
+        return metrics
+    
+    def read_windows(self, file_path: str, native_sr: int, n_windows: int, window_sec: float,
+                     rng: np.random.Generator, data: Optional[bytes] = None) -> List[np.ndarray]:
+        # One window at a random offset in each of n_windows equal strata,
+        # read by seeking so the rest of the file is never decoded
+        windows = []
+        with sf.SoundFile(self.audio_source(file_path, data)) as f:
+            length = int(window_sec * native_sr)
+            stride = (f.frames - length) / n_windows
+            starts = (np.arange(n_windows) + rng.uniform(0, 1, n_windows)) * stride
+            for start in starts.astype(np.int64):
+                with self.timer.stage('decode'):
+                    f.seek(int(start))
+                    block = f.read(length, dtype='float32', always_2d=True)
+                mono = block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+                with self.timer.stage('resample'):
+                    windows.append(self.resample(mono, native_sr))
+        return windows
+    
+    def triage_is_clear(self, estimates: Dict[str, Tuple[float, float, float]]) -> bool:
+        # Clear when some metric fails for certain, or all pass for certain
+        all_pass = True
+        for _, name, key in THRESHOLD_CHECKS:
+            threshold = self.thresholds[key]
+            _, low, high = estimates[name]
+            if key.startswith('min_'):
+                passes, fails = low >= threshold, high < threshold
+            else:
+                passes, fails = high <= threshold, low > threshold
+            if fails:
+                return True
+            all_pass = all_pass and passes
+        return all_pass
+    
+    def fails_thresholds(self, metrics: Dict[str, float]) -> bool:
+        # Whether any metric computed so far already rejects the file
+        for _, name, key in THRESHOLD_CHECKS:
+            if name not in metrics:
+                continue
+            threshold = self.thresholds[key]
+            if metrics[name] < threshold if key.startswith('min_') else metrics[name] > threshold:
+                return True
+        return False
+    
+    def prefetch(self, file_paths: Iterable[str]) -> Iterable[Tuple[str, Optional[bytes]]]:
+        params = self.config.get('prefetch') or {}
+        if not params.get('enabled', True):
+            return ((path, None) for path in file_paths)
+        return Prefetcher(
+            file_paths,
+            threads=params.get('threads', 2),
+            max_files=params.get('max_files', 8),
+            max_bytes=int(params.get('max_mb', 64) * 1024 * 1024),
+            max_file_bytes=int(params.get('max_file_mb', 32) * 1024 * 1024),
+            timer=self.timer,
+        )
+    
+    def decodes_whole(self, file_path: str, data: Optional[bytes] = None,
+                      max_samples: Optional[int] = None) -> bool:
+        # Whether analyze_file would decode the whole file into memory, i.e.
+        # it is not rejected from its header, cached, triaged or streamed,
+        # and is at most max_samples long at the target rate. Unreadable
+        # headers answer False and are left to analyze_file.
+        if self.triage:
+            return False
+        try:
+            header = self.probe_audio(file_path, data)
+            if header is None:
+                return False
+            duration, native_sr = header
+            # Even without the prescan, files outside the duration limits
+            # are left to analyze_file rather than decoded here
+            if (not self.segments_wanted(duration)
+                    and self.check_duration(file_path, duration, self.config['sample_rate']) is not None):
+                return False
+            stream_from = self.config.get('stream_min_duration_sec', 60.0)
+            if stream_from is not None and duration >= stream_from:
+                return False
+            if max_samples is not None and math.ceil(duration * self.config['sample_rate']) > max_samples:
+                return False
+            return not (self.cache and 
+                        self.cache.get(self.cache.file_key(file_path, data, self.cache_variant(False))) is not None)
+        except Exception:
+            return False
+    
+    def decode_to_ring(self, file_path: str, ring: SharedRing) -> Optional[RingSlot]:
+        # Decode pool half of analyze_file: audio that would be analysed in
+        # memory is decoded into a ring slot. None hands the file to the
+        # analysis pool by path, as do errors and no slot freeing up within
+        # slot_wait_sec.
+        if not self.decodes_whole(file_path, max_samples=ring.slot_samples):
+            return None
+        
+        with self.timer.stage('ring_wait'):
+            index = ring.acquire(timeout=self.decode_pool.get('slot_wait_sec', 60.0))
+        if index is None:
+            return None
+        
+        try:
+            out = ring.buffer[index]
+            with self.timer.stage('decode'):
+                n_samples = self.read_into(file_path, out)
+            if n_samples is None:
+                audio, sr = self.load_audio(file_path)
+                if len(audio) > len(out):
+                    raise ValueError("decoded audio is larger than a ring slot")
+                out[:len(audio)] = audio
+                n_samples = len(audio)
+            return RingSlot(index, n_samples, self.config['sample_rate'])
+        except Exception:
+            ring.release(index)
+            return None
+    
+    def read_into(self, file_path: str, out: np.ndarray) -> Optional[int]:
+        # Mono files at the target rate are decoded straight into out, with
+        # no intermediate copy; None means decode and resample as usual
+        if Path(file_path).suffix.lstrip('.').upper() not in sf.available_formats():
+            return None
+        with sf.SoundFile(file_path) as f:
+            if f.samplerate != self.config['sample_rate'] or f.channels != 1 or f.frames > len(out):
+                return None
+            return len(f.read(dtype='float32', out=out[:f.frames]))
+    
+    def process_archive(self, archive_path: str, done: Optional[Dict[str, bool]] = None,
+                        filtered_path: Optional[str] = None) -> List[Tuple[AudioMetrics, List[SegmentMetrics]]]:
+        # Audio members are read in archive order and analyzed from memory,
+        # reported as archive::member. With filtered_path, samples (members
+        # sharing a WebDataset key) are copied to a new shard if their audio
+        # is accepted; samples without audio are copied as they are. done
+        # maps members checkpointed by an earlier run to their acceptance.
+        done = done or {}
+        results = []
+        writer = FilteredArchiveWriter(filtered_path) if filtered_path else None
+        try:
+            samples = iter_samples(archive_path) if writer else ([member] for member in iter_members(archive_path))
+            for sample in samples:
+                keep = None
+                for member in sample:
+                    if not is_audio_member(member.name):
+                        continue
+                    path = member_path(archive_path, member.name)
+                    if path in done:
+                        accepted = done[path]
+                    else:
+                        result = self.process_file_segments(path, member.data)
+                        results.append(result)
+                        accepted = result[0].is_accepted
+                    keep = bool(keep) or accepted
+                if writer and keep is not False:
+                    for member in sample:
+                        writer.add(member)
+            if writer:
+                writer.commit()
+                writer = None
+        except Exception as e:
+            # Members analyzed before the archive turned out unreadable keep
+            # their results; the archive gets a row of its own
+            results.append((self.rejected_metrics(archive_path, 0, 0, f"Processing error: {str(e)}"), []))
+        finally:
+            if writer:
+                writer.discard()
+        return results
+    
+    def analyze_ring_slot(self, file_path: str, slot: Optional[RingSlot], ring: SharedRing,
+                          decode_stages: Dict[str, List[float]]) -> Tuple[AudioMetrics, List[SegmentMetrics]]:
+        # Analysis pool half: the file's decode pool stages are counted with
+        # its own, and the slot is recycled once the analysis is done
+        for name, (wall, cpu) in decode_stages.items():
+            self.timer.add(name, wall, cpu)
+        if slot is None:
+            return self.process_file_segments(file_path)
+        try:
+            return self.process_file_segments(file_path, features=self.analyzer.frame_features(ring.view(slot)))
+        finally:
+            ring.release(slot.index)
+    
+    def take_stats(self) -> StageStats:
+        stats, self.stats = self.stats, self.create_stats()
+        return stats
+    
+    def segments_wanted(self, duration: float) -> bool:
+        # With segmentation on, files over max_duration_sec are still
+        # analyzed so their usable segments can be kept
+        return bool(self.segmentation) and duration > self.thresholds['max_duration_sec']
+    
+    def score_segments(self, file_path: str, segments: List[Dict], sr: int) -> List[SegmentMetrics]:
+        if not segments:
+            return []
+        
+        batch = self.score_batch({name: [seg[name] for seg in segments] for name in METRIC_NAMES})
+        
+        return [
+            SegmentMetrics(
                 file_path=file_path,
-                duration=0, sample_rate=0,
-                snr_db=0, silence_ratio=0, clipping_ratio=0,
-                zero_crossing_rate=0, spectral_centroid_mean=0,
-                spectral_rolloff_mean=0, rms_energy=0, dynamic_range_db=0,
-                quality_score=0,
-                is_accepted=False,
-                rejection_reasons=[f"Processing error: {str(e)}"]
+                start_sec=seg['start'] / sr,
+                end_sec=seg['end'] / sr,
+                duration=(seg['end'] - seg['start']) / sr,
+                quality_score=float(batch.quality_score[idx]),
+                is_accepted=bool(batch.is_accepted[idx]),
+                rejection_reasons=batch.reasons(idx),
+                **{name: seg[name] for name in METRIC_NAMES}
             )
+            for idx, seg in enumerate(segments)
+        ]
     
-    def process_dataset(self, file_paths: List[str], output_path: str, 
-                       num_workers: int = 4) -> List[AudioMetrics]:
-        results = []
+    def process_dataset(self, file_paths: Iterable[str], output_path: str, 
+                       num_workers: int = 4, resume: bool = False,
+                       collect_results: bool = True) -> List[AudioMetrics]:
+        # Results are streamed to checkpoint shards as they complete; the
+        # final outputs are built from the shards, so memory does not grow
+        # with the dataset unless collect_results asks for the full list.
+        # file_paths other than a list are consumed as they are produced,
+        # e.g. while a directory scan is still running.
+        writer = ResultWriter(Path(output_path) / "shards", resume=resume,
+                              flush_every=self.config.get('checkpoint_every', 1000))
+        
+        # Archives are whole tasks; their members are only known once read
+        archives = []
+        if isinstance(file_paths, list):
+            archives = [path for path in file_paths if is_archive(path)]
+            if archives:
+                file_paths = [path for path in file_paths if not is_archive(path)]
+            
+            if resume:
+                done = len(file_paths) + len(archives)
+                file_paths = [path for path in file_paths if path not in writer.completed]
+                archives = [path for path in archives if path not in writer.completed]
+                members = sum(split_member_path(path)[1] is not None for path in writer.completed)
+                print(f"Resuming: {done - len(file_paths) - len(archives)} files" + 
+                      (f" and {members} archive members" if members else "") + " already processed")
+            
+            total = len(file_paths) + len(archives)
+            print(f"Processing {len(file_paths)} files" + 
+                  (f" and {len(archives)} archives" if archives else "") + f" with {num_workers} workers...")
+        else:
+            # Archives are set aside as they turn up and read after the files
+            file_paths = self._split_archives(file_paths, archives, writer.completed if resume else set())
+            if resume:
+                print(f"Resuming: {len(writer.completed)} results already checkpointed")
+            total = None
+            print(f"Processing files as they are found with {num_workers} workers...")
+        
+        stage_log = None
+        if self.profiling:
+            stage_log = open(Path(output_path) / "stage_timings.jsonl", 'a' if resume else 'w')
+        
+        try:
+            with tqdm(total=total) as progress:
+                if file_paths and self.decode_pool:
+                    self._run_split(file_paths, writer, progress, num_workers, stage_log)
+                elif file_paths:
+                    self._run_chunked(file_paths, writer, progress, num_workers, stage_log)
+                if archives:
+                    self._run_archives(archives, writer, progress, num_workers, output_path, 
+                                       resume, stage_log)
+        finally:
+            writer.close()
+            if stage_log:
+                stage_log.close()
+        
+        if self.cache:
+            self.cache.close()
         
-        print(f"Processing {len(file_paths)} files with {num_workers} workers...")
+        self.save_results(self.iter_checkpointed(output_path), output_path)
+        if self.segmentation:
+            self.save_segments(self.iter_checkpointed_segments(output_path), output_path)
+        self.print_summary(self.iter_checkpointed(output_path))
+        self.print_timings(self.stats.files)
+        if self.profiling:
+            self.save_profile(output_path)
         
-        with ProcessPoolExecutor(max_workers=num_workers) as executor:
-            future_to_path = {
-                executor.submit(self.process_file, path): path 
-                for path in file_paths
-            }
+        return list(self.iter_checkpointed(output_path)) if collect_results else []
+    
+    def _split_archives(self, file_paths: Iterable[str], archives: List[str], 
+                        completed: Set[str]) -> Iterator[str]:
+        for path in file_paths:
+            if path in completed:
+                continue
+            if is_archive(path):
+                archives.append(path)
+            else:
+                yield path
+    
+    def _run_chunked(self, file_paths: Iterable[str], writer: ResultWriter, progress: tqdm,
+                     num_workers: int, stage_log=None):
+        # Small datasets get smaller chunks so every worker still has work.
+        # Streamed paths are buffered up to the size at which the cap stops
+        # mattering, so it applies to them too.
+        chunk_size = max(1, self.config.get('chunk_size', 32))
+        paths = iter(file_paths)
+        head = list(islice(paths, 4 * num_workers * chunk_size))
+        chunk_size = min(chunk_size, max(1, -(-len(head) // (4 * num_workers))))
+        max_in_flight = max(1, self.config.get('max_in_flight_chunks', 2 * num_workers))
+        paths = chain(head, paths)
+        chunks = iter(lambda: list(islice(paths, chunk_size)), [])
+        
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(type(self), self.config)) as executor:
+            in_flight = {}
+            
+            for chunk in chunks:
+                if len(in_flight) >= max_in_flight:
+                    self._drain(in_flight, writer, progress, FIRST_COMPLETED, stage_log)
+                in_flight[executor.submit(_process_chunk, chunk)] = chunk
             
-            for future in tqdm(as_completed(future_to_path), total=len(file_paths)):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    path = future_to_path[future]
-                    print(f"Error processing {path}: {e}")
+            self._drain(in_flight, writer, progress, ALL_COMPLETED, stage_log)
+    
+    def _run_split(self, file_paths: Iterable[str], writer: ResultWriter, progress: tqdm,
+                   num_workers: int, stage_log=None):
+        # Decoding and analysis run in separate pools joined by a shared
+        # memory ring. Files are single tasks in both pools, so a decoder
+        # holds at most one slot and decoders block once every slot waits
+        # on the analysis pool.
+        params = self.decode_pool
+        decode_workers = max(1, params.get('workers', 2))
+        ring = SharedRing.create(max(1, params.get('ring_slots', 16)),
+                                 int(params.get('slot_mb', 8) * 1024 * 1024) // 4)
+        max_in_flight = ring.n_slots + decode_workers + 2 * num_workers
+        paths = iter(file_paths)
+        decoding, analyzing = {}, {}
         
-        self.save_results(results, output_path)
-        self.print_summary(results)
+        try:
+            with ProcessPoolExecutor(max_workers=decode_workers, initializer=_init_worker,
+                                     initargs=(type(self), self.config, ring)) as decoders, \
+                 ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                     initargs=(type(self), self.config, ring)) as analyzers:
+                while True:
+                    while len(decoding) + len(analyzing) < max_in_flight:
+                        path = next(paths, None)
+                        if path is None:
+                            break
+                        decoding[decoders.submit(_decode_file, path)] = path
+                    if not decoding and not analyzing:
+                        break
+                    
+                    done, _ = wait([*decoding, *analyzing], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in decoding:
+                            path = decoding.pop(future)
+                            try:
+                                slot, stages = future.result()
+                            except Exception:
+                                slot, stages = None, {}
+                            analyzing[analyzers.submit(_analyze_decoded, path, slot, stages)] = path
+                            continue
+                        
+                        path = analyzing.pop(future)
+                        try:
+                            result, stats = future.result()
+                            self._write_results([result], stats, writer, stage_log)
+                        except Exception as e:
+                            print(f"Error processing {path}: {e}")
+                        progress.update(1)
+        finally:
+            ring.unlink()
+    
+    def _run_archives(self, archives: List[str], writer: ResultWriter, progress: tqdm, num_workers: int,
+                      output_path: str, resume: bool = False, stage_log=None):
+        # One task per archive, so each is read sequentially by one worker.
+        # Filtered shards keep their path relative to the archives' common
+        # directory under <output_path>/filtered_shards/.
+        done = {}
+        if resume:
+            for row in writer.iter_rows():
+                archive_path, member = split_member_path(row['file_path'])
+                if member is not None:
+                    done.setdefault(archive_path, {})[row['file_path']] = row['is_accepted']
         
-        return results
+        filtered_dir = None
+        if (self.config.get('archives') or {}).get('write_filtered'):
+            filtered_dir = Path(output_path) / "filtered_shards"
+            root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in archives])
+        
+        max_in_flight = max(1, self.config.get('max_in_flight_chunks', 2 * num_workers))
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(type(self), self.config)) as executor:
+            in_flight = {}
+            
+            for archive_path in archives:
+                if len(in_flight) >= max_in_flight:
+                    self._drain(in_flight, writer, progress, FIRST_COMPLETED, stage_log)
+                filtered_path = (str(filtered_dir / os.path.relpath(os.path.abspath(archive_path), root))
+                                 if filtered_dir else None)
+                future = executor.submit(_process_archive, archive_path, done.get(archive_path), filtered_path)
+                in_flight[future] = [archive_path]
+            
+            self._drain(in_flight, writer, progress, ALL_COMPLETED, stage_log)
+    
+    def _drain(self, in_flight: Dict, writer: ResultWriter, progress: tqdm, return_when: str,
+               stage_log=None):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            chunk = in_flight.pop(future)
+            try:
+                results, stats = future.result()
+                self._write_results(results, stats, writer, stage_log)
+            except Exception as e:
+                print(f"Error processing chunk starting at {chunk[0]}: {e}")
+            progress.update(len(chunk))
+    
+    def _write_results(self, results: List[Tuple[AudioMetrics, List[SegmentMetrics]]], stats: StageStats,
+                       writer: ResultWriter, stage_log=None):
+        if stage_log:
+            stage_log.writelines(json.dumps(record) + "\n" for record in stats.take_records())
+        self.stats.merge(stats)
+        for result, segments in results:
+            row = asdict(result)
+            if segments:
+                # Stored with their file so resume never splits them
+                row['segments'] = [asdict(segment) for segment in segments]
+            writer.write(row)
     
-    def save_results(self, results: List[AudioMetrics], output_path: str):
+    def iter_checkpointed(self, output_path: str) -> Iterator[AudioMetrics]:
+        for row in iter_shards(Path(output_path) / "shards"):
+            row.pop('segments', None)
+            yield AudioMetrics(**row)
+    
+    def iter_checkpointed_segments(self, output_path: str) -> Iterator[SegmentMetrics]:
+        for row in iter_shards(Path(output_path) / "shards"):
+            for segment in row.get('segments', ()):
+                yield SegmentMetrics(**segment)
+    
+    def save_segments(self, segments: Iterable[SegmentMetrics], output_path: str):
         output_path = Path(output_path)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        csv_path = output_path / "filtering_results.csv"
-        with open(csv_path, 'w', newline='') as f:
-            if results:
-                writer = csv.DictWriter(f, fieldnames=asdict(results[0]).keys())
-                writer.writeheader()
-                for result in results:
-                    row = asdict(result)
-                    row['rejection_reasons'] = '; '.join(row['rejection_reasons'])
-                    writer.writerow(row)
-        
-        json_path = output_path / "filtering_results.json"
-        with open(json_path, 'w') as f:
-            json.dump([asdict(r) for r in results], f, indent=2)
-        
-        accepted_path = output_path / "accepted_files.txt"
-        rejected_path = output_path / "rejected_files.txt"
-        
-        with open(accepted_path, 'w') as f:
-            for r in results:
-                if r.is_accepted:
-                    f.write(f"{r.file_path}\n")
-        
-        with open(rejected_path, 'w') as f:
-            for r in results:
-                if not r.is_accepted:
-                    f.write(f"{r.file_path}\t{'; '.join(r.rejection_reasons)}\n")
+        with open(output_path / "segments.csv", 'w', newline='') as csv_file, \
+             open(output_path / "accepted_segments.txt", 'w') as accepted_file:
+            csv_writer = csv.DictWriter(csv_file, fieldnames=[f.name for f in fields(SegmentMetrics)])
+            csv_writer.writeheader()
+            
+            total = accepted = 0
+            accepted_sec = 0.0
+            for segment in segments:
+                csv_writer.writerow({**asdict(segment), 
+                                     'rejection_reasons': '; '.join(segment.rejection_reasons)})
+                total += 1
+                if segment.is_accepted:
+                    accepted += 1
+                    accepted_file.write(f"{segment.file_path}\t{segment.start_sec:.3f}\t{segment.end_sec:.3f}\n")
+                    accepted_sec += segment.duration
+        
+        print(f"Segments: {accepted}/{total} accepted ({accepted_sec / 3600:.2f} hours)")
+    
+    def save_results(self, results: Iterable[AudioMetrics], output_path: str):
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        formats = self.config.get('output_formats', ['csv', 'json'])
+        fieldnames = [f.name for f in fields(AudioMetrics)]
+        remove_unselected_results(output_path, formats)
+        
+        with ExitStack() as stack:
+            csv_writer = json_file = parquet_writer = None
+            if 'csv' in formats:
+                csv_file = stack.enter_context(open(output_path / "filtering_results.csv", 'w', newline=''))
+                csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            if 'json' in formats:
+                json_file = stack.enter_context(open(output_path / "filtering_results.json", 'w'))
+                json_file.write("[")
+            if 'parquet' in formats:
+                parquet_writer = ParquetResultWriter(
+                    output_path / "filtering_results.parquet",
+                    row_group_size=self.config.get('parquet_row_group_size', 65536))
+                stack.callback(parquet_writer.close)
+            accepted_file = stack.enter_context(open(output_path / "accepted_files.txt", 'w'))
+            rejected_file = stack.enter_context(open(output_path / "rejected_files.txt", 'w'))
+            
+            count = 0
+            for result in results:
+                row = asdict(result)
+                reasons = '; '.join(result.rejection_reasons)
+                
+                if csv_writer:
+                    if count == 0:
+                        csv_writer.writeheader()
+                    csv_writer.writerow({**row, 'rejection_reasons': reasons})
+                
+                if json_file:
+                    # Same layout as json.dump(list, indent=2), one record at a time
+                    json_file.write(("," if count else "") + "\n" + 
+                                    textwrap.indent(json.dumps(json_safe(row), indent=2, allow_nan=False), "  "))
+                
+                if parquet_writer:
+                    parquet_writer.write({**row, 'rejection_mask': reason_mask(result.rejection_reasons)})
+                
+                if result.is_accepted:
+                    accepted_file.write(f"{result.file_path}\n")
+                else:
+                    rejected_file.write(f"{result.file_path}\t{reasons}\n")
+                count += 1
+            
+            if json_file:
+                json_file.write("\n]" if count else "]")
         
         print(f"\nResults saved to {output_path}/")
     
-    def print_summary(self, results: List[AudioMetrics]):
-        total = len(results)
-        accepted = sum(1 for r in results if r.is_accepted)
+    def print_summary(self, results: Iterable[AudioMetrics]):
+        total = 0
+        accepted = 0
+        triaged = 0
+        reason_counts = {}
+        scores = array('d')
+        
+        for r in results:
+            total += 1
+            scores.append(r.quality_score)
+            if r.analysis_tier == 'triage':
+                triaged += 1
+            if r.is_accepted:
+                accepted += 1
+            else:
+                for reason in r.rejection_reasons:
+                    reason_key = reason.split(':')[0]
+                    reason_counts[reason_key] = reason_counts.get(reason_key, 0) + 1
+        
         rejected = total - accepted
         
         print("\n" + "="*60)
         print("FILTERING SUMMARY")
         print("="*60)
         print(f"Total files processed: {total}")
+        
+        if total == 0:
+            print("="*60)
+            return
+        
         print(f"Accepted: {accepted} ({accepted/total*100:.1f}%)")
         print(f"Rejected: {rejected} ({rejected/total*100:.1f}%)")
+        if triaged:
+            print(f"Decided by triage estimates: {triaged} ({triaged/total*100:.1f}%)")
         
         if rejected > 0:
             print("\nRejection reasons breakdown:")
-            reason_counts = {}
-            for r in results:
-                if not r.is_accepted:
-                    for reason in r.rejection_reasons:
-                        reason_key = reason.split(':')[0]
-                        reason_counts[reason_key] = reason_counts.get(reason_key, 0) + 1
-            
             for reason, count in sorted(reason_counts.items(), key=lambda x: x[1], reverse=True):
                 print(f"  {reason}: {count} ({count/rejected*100:.1f}%)")
         
-        scores = [r.quality_score for r in results]
+        scores = np.frombuffer(scores, dtype=np.float64)
         print(f"\nQuality Score Statistics:")
         print(f"  Mean: {np.mean(scores):.2f}")
         print(f"  Median: {np.median(scores):.2f}")
@@ -323,11 +1751,110 @@ class AudioFilterPipeline:
         print(f"  Min: {np.min(scores):.2f}")
         print(f"  Max: {np.max(scores):.2f}")
         print("="*60)
+    
+    def print_timings(self, n_files: int):
+        total = self.stats.wall('total')
+        if n_files == 0 or total <= 0:
+            return
+        
+        stages = [name for name in self.stats.totals if name != 'total']
+        stages.sort(key=self.stats.wall, reverse=True)
+        
+        print(f"\nWorker time: {total:.2f}s ({total / n_files * 1000:.1f} ms per file)")
+        for stage in stages:
+            seconds = self.stats.wall(stage)
+            print(f"  {stage.replace('_', ' ').capitalize()}: {seconds:.2f}s ({seconds / total * 100:.1f}%)")
+        print("="*60)
+    
+    def save_profile(self, output_path: str):
+        output_path = Path(output_path)
+        with open(output_path / "profile.json", 'w') as f:
+            json.dump(self.stats.to_dict(), f, indent=2)
+        
+        slowest = self.stats.slowest_files()
+        if not slowest:
+            return
+        
+        # The slowest files are re-run one by one under the profiler after
+        # the main run, so it adds no overhead there. The cache is bypassed
+        # so the profile shows the decode and analysis.
+        profiler = self.profiling.get('profiler', 'cprofile')
+        suffix = '.html' if profiler == 'pyinstrument' else '.prof'
+        profile_dir = output_path / "profiles"
+        profile_dir.mkdir(exist_ok=True)
+        
+        cache, self.cache = self.cache, None
+        try:
+            for rank, file_path in enumerate(slowest):
+                data = read_member(file_path) if split_member_path(file_path)[1] is not None else None
+                profile_call(profiler, str(profile_dir / f"{rank:02d}_{Path(file_path).stem}{suffix}"),
+                             self.analyze_file, file_path, data)
+                self.timer.take()
+        finally:
+            self.cache = cache
+        
+        print(f"Profiles of the {len(slowest)} slowest files saved to {profile_dir}/")
+
+
+# Each pool worker builds its pipeline once in the initializer; tasks then
+# only carry a chunk of paths instead of a pickled pipeline per file.
+_worker_pipeline = None
+_worker_ring = None
+
+
+def _init_worker(pipeline_class: type, config: Dict, ring: Optional[SharedRing] = None):
+    global _worker_pipeline, _worker_ring
+    _worker_pipeline = pipeline_class(config)
+    _worker_ring = ring
+
+
+def _process_chunk(file_paths: List[str]) -> Tuple[List[Tuple[AudioMetrics, List[SegmentMetrics]]], StageStats]:
+    items = _worker_pipeline.prefetch(file_paths)
+    results = [_worker_pipeline.process_file_segments(path, data) for path, data in items]
+    return results, _worker_pipeline.take_stats()
+
+
+def _process_archive(archive_path: str, done: Optional[Dict[str, bool]],
+                     filtered_path: Optional[str]) -> Tuple[List[Tuple[AudioMetrics, List[SegmentMetrics]]], StageStats]:
+    results = _worker_pipeline.process_archive(archive_path, done, filtered_path)
+    return results, _worker_pipeline.take_stats()
+
+
+def _decode_file(file_path: str) -> Tuple[Optional[RingSlot], Dict[str, List[float]]]:
+    with _worker_pipeline.timer.stage('total'):
+        slot = _worker_pipeline.decode_to_ring(file_path, _worker_ring)
+    return slot, _worker_pipeline.timer.take()
+
+
+def _analyze_decoded(file_path: str, slot: Optional[RingSlot],
+                     decode_stages: Dict[str, List[float]]) -> Tuple[Tuple[AudioMetrics, List[SegmentMetrics]], StageStats]:
+    result = _worker_pipeline.analyze_ring_slot(file_path, slot, _worker_ring, decode_stages)
+    return result, _worker_pipeline.take_stats()
 
 
 def create_default_config() -> Dict:
     return {
         'sample_rate': 16000,
+        'header_prescan': True,
+        'stream_min_duration_sec': 60.0,
+        'early_exit': False,
+        'archives': {
+            'write_filtered': False,
+        },
+        'decode_pool': {
+            'enabled': False,
+            'workers': 2,
+            'ring_slots': 16,
+            'slot_mb': 8,
+            'slot_wait_sec': 60.0,
+        },
+        'prefetch': {
+            'enabled': True,
+            'threads': 2,
+            'max_files': 8,
+            'max_mb': 64,
+            'max_file_mb': 32,
+        },
         'thresholds': {
             'min_snr_db': 10.0,
             'max_silence_ratio': 0.4,
@@ -343,5 +1870,26 @@ def create_default_config() -> Dict:
             'clipping': 0.20,
             'dynamic_range': 0.15,
             'rms': 0.15,
+        },
+        'profiling': {
+            'enabled': False,
+            'profile_slowest': 0,
+            'profiler': 'cprofile',
+        },
+        'triage': {
+            'enabled': False,
+            'sample_fraction': 0.1,
+            'window_sec': 1.0,
+            'min_windows': 8,
+            'confidence': 0.95,
+            'bootstrap': 64,
+            'seed': 0,
+        },
+        'segmentation': {
+            'enabled': False,
+            'top_db': 30,
+            'min_segment_sec': 1.0,
+            'max_segment_sec': 30.0,
+            'merge_gap_sec': 0.5,
         }
     }
@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import soundfile as sf
+import librosa
+
+from audio_filter_pipeline import AudioFilterPipeline, create_default_config
+from demo import SAMPLE_TYPES, synthesize_sample
+from run_pipeline import load_config
+
+
+METRIC_METHODS = {
+    'snr': 'compute_snr',
+    'silence_ratio': 'compute_silence_ratio',
+    'clipping_ratio': 'compute_clipping_ratio',
+    'zero_crossing_rate': 'compute_zero_crossing_rate',
+    'spectral': 'compute_spectral_features',
+    'rms_energy': 'compute_rms_energy',
+    'dynamic_range': 'compute_dynamic_range',
+}
+
+
+def sample_durations(rng: np.random.Generator, num_files: int, distribution: str,
+                     mean: float, min_duration: float, max_duration: float) -> np.ndarray:
+    if distribution == 'fixed':
+        durations = np.full(num_files, mean)
+    elif distribution == 'uniform':
+        durations = rng.uniform(min_duration, max_duration, num_files)
+    elif distribution == 'lognormal':
+        # Median at the requested mean, long right tail like real recordings
+        durations = rng.lognormal(np.log(mean), 0.6, num_files)
+    else:
+        raise ValueError(f"Unknown duration distribution: {distribution}")
+    return np.clip(durations, min_duration, max_duration)
+
+
+def generate_corpus(output_dir: str, num_files: int = 200, distribution: str = 'uniform',
+                    mean_duration: float = 8.0, min_duration: float = 2.0,
+                    max_duration: float = 20.0, sample_rate: int = 16000,
+                    audio_format: str = 'wav', seed: int = 0) -> Dict:
+    # Synthetic clips of the four demo types with the given duration
+    # distribution. The same parameters always give the same corpus, which
+    # is reused if its manifest matches.
+    output_path = Path(output_dir)
+    manifest_path = output_path / "corpus.json"
+    params = {
+        'num_files': num_files,
+        'distribution': distribution,
+        'mean_duration': mean_duration,
+        'min_duration': min_duration,
+        'max_duration': max_duration,
+        'sample_rate': sample_rate,
+        'format': audio_format,
+        'seed': seed,
+    }
+    
+    if manifest_path.exists():
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest['params'] == params and all(Path(p).exists() for p in manifest['files']):
+            print(f"Reusing corpus in {output_dir}/")
+            return manifest
+    
+    output_path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    durations = sample_durations(rng, num_files, distribution, mean_duration,
+                                 min_duration, max_duration)
+    
+    print(f"Generating {num_files} {audio_format} files at {sample_rate} Hz...")
+    files = []
+    for i, duration in enumerate(durations):
+        sample_type = SAMPLE_TYPES[i % len(SAMPLE_TYPES)]
+        signal = synthesize_sample(sample_type, float(duration), sample_rate, rng=rng)
+        file_path = output_path / f"bench_{i:06d}_{sample_type}.{audio_format}"
+        sf.write(file_path, signal, sample_rate)
+        files.append(str(file_path))
+    
+    manifest = {
+        'params': params,
+        'files': files,
+        'total_audio_sec': float(np.sum(durations)),
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    return manifest
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'main': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def benchmark_analyzer(pipeline: AudioFilterPipeline, file_paths: List[str],
+                       repeats: int = 5) -> Dict:
+    # Per-metric time on decoded clips. Each compute_* method is timed on its
+    # own, building the frame features it needs, and analyze_audio times all
+    # metrics sharing one set of features.
+    analyzer = pipeline.analyzer
+    clips = [pipeline.load_audio(path)[0] for path in file_paths]
+    audio_sec = sum(len(clip) for clip in clips) / analyzer.sr
+    
+    def best_of(func) -> float:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for clip in clips:
+                func(clip)
+            times.append(time.perf_counter() - start)
+        return min(times)
+    
+    # Warm-up so one-off JIT and FFT planning costs are not measured
+    analyzer.analyze_audio(clips[0])
+    
+    per_metric = {name: best_of(getattr(analyzer, method))
+                  for name, method in METRIC_METHODS.items()}
+    analyze = best_of(analyzer.analyze_audio)
+    
+    # The SNR noise floor estimate alone, on frame energies computed once
+    energies = {id(clip): analyzer.frame_features(clip).frame_energy(2048, 1024) for clip in clips}
+    snr_estimator = best_of(lambda clip: analyzer.snr_from_energy(energies[id(clip)]))
+    
+    return {
+        'clips': len(clips),
+        'audio_sec': audio_sec,
+        'per_metric_sec': per_metric,
+        'analyze_audio_sec': analyze,
+        'snr_estimator_sec': snr_estimator,
+        'analyze_audio_x_realtime': audio_sec / analyze if analyze > 0 else None,
+    }
+
+
+def benchmark_pipeline(config: Dict, file_paths: List[str], total_audio_sec: float,
+                       worker_counts: List[int], work_dir: str) -> List[Dict]:
+    runs = []
+    for num_workers in worker_counts:
+        pipeline = AudioFilterPipeline(config)
+        output_path = Path(work_dir) / f"workers_{num_workers}"
+        
+        start = time.perf_counter()
+        pipeline.process_dataset(file_paths, str(output_path), num_workers=num_workers,
+                                 collect_results=False)
+        wall = time.perf_counter() - start
+        
+        runs.append({
+            'num_workers': num_workers,
+            'wall_sec': wall,
+            'files_per_sec': len(file_paths) / wall,
+            'audio_hours_per_sec': total_audio_sec / 3600 / wall,
+            'worker_sec': {name: pipeline.stats.wall(name) for name in pipeline.stats.totals},
+        })
+    
+    base = runs[0]['files_per_sec'] / runs[0]['num_workers']
+    for run in runs:
+        run['speedup'] = run['files_per_sec'] / runs[0]['files_per_sec']
+        run['efficiency'] = run['files_per_sec'] / (base * run['num_workers'])
+    return runs
+
+
+def compare_to_baseline(report: Dict, baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    
+    regressions = []
+    previous = {run['num_workers']: run for run in baseline.get('pipeline', [])}
+    for run in report.get('pipeline', []):
+        old = previous.get(run['num_workers'])
+        if old and run['files_per_sec'] < old['files_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{run['num_workers']} workers: {run['files_per_sec']:.2f} files/s "
+                f"vs {old['files_per_sec']:.2f} in baseline"
+            )
+    
+    old_analyzer = baseline.get('analyzer')
+    new_analyzer = report.get('analyzer')
+    if old_analyzer and new_analyzer:
+        old_rate = old_analyzer['audio_sec'] / old_analyzer['analyze_audio_sec']
+        new_rate = new_analyzer['audio_sec'] / new_analyzer['analyze_audio_sec']
+        if new_rate < old_rate * (1 - tolerance):
+            regressions.append(
+                f"analyze_audio: {new_rate:.1f}x realtime vs {old_rate:.1f}x in baseline"
+            )
+    return regressions
+
+
+def print_report(report: Dict):
+    print("\n" + "="*60)
+    print("BENCHMARK RESULTS")
+    print("="*60)
+    corpus = report['corpus']
+    print(f"Corpus: {corpus['num_files']} files, {corpus['total_audio_sec'] / 3600:.2f} hours")
+    
+    analyzer = report.get('analyzer')
+    if analyzer:
+        print(f"\nAnalyzer ({analyzer['clips']} clips, {analyzer['audio_sec']:.1f}s of audio):")
+        for name, seconds in analyzer['per_metric_sec'].items():
+            print(f"  {name}: {seconds * 1000:.1f} ms")
+        print(f"  analyze_audio: {analyzer['analyze_audio_sec'] * 1000:.1f} ms "
+              f"({analyzer['analyze_audio_x_realtime']:.0f}x realtime)")
+        if 'snr_estimator_sec' in analyzer:
+            print(f"  snr estimator only: {analyzer['snr_estimator_sec'] * 1000:.2f} ms")
+    
+    if report.get('pipeline'):
+        print("\nPipeline:")
+        for run in report['pipeline']:
+            print(f"  {run['num_workers']} workers: {run['files_per_sec']:.2f} files/s, "
+                  f"{run['audio_hours_per_sec'] * 3600:.1f}x realtime, "
+                  f"speedup {run['speedup']:.2f} (efficiency {run['efficiency']:.0%})")
+    
+    rss = report['peak_rss_mb']
+    print(f"\nPeak RSS: {rss['main']:.0f} MB main, {rss['workers']:.0f} MB largest worker")
+    print("="*60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the filtering pipeline on a reproducible synthetic corpus')
+    
+    parser.add_argument('--corpus-dir', type=str, default='bench_data',
+                       help='Directory for the generated corpus (reused if unchanged)')
+    parser.add_argument('--num-files', type=int, default=200,
+                       help='Number of files in the corpus')
+    parser.add_argument('--duration-dist', choices=['fixed', 'uniform', 'lognormal'], default='uniform',
+                       help='Distribution of file durations')
+    parser.add_argument('--mean-duration', type=float, default=8.0,
+                       help='Duration for fixed, median for lognormal (seconds)')
+    parser.add_argument('--min-duration', type=float, default=2.0,
+                       help='Shortest file duration (seconds)')
+    parser.add_argument('--max-duration', type=float, default=20.0,
+                       help='Longest file duration (seconds)')
+    parser.add_argument('--sample-rate', type=int, default=16000,
+                       help='Sample rate of the generated files')
+    parser.add_argument('--format', choices=['wav', 'flac', 'ogg'], default='wav',
+                       help='Audio format of the generated files')
+    parser.add_argument('--seed', type=int, default=0,
+                       help='Random seed for the corpus')
+    parser.add_argument('--config', type=str,
+                       help='Pipeline configuration JSON file')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                       help='Worker counts to measure scaling over')
+    parser.add_argument('--analyzer-files', type=int, default=20,
+                       help='Files used for the per-metric analyzer timings (0 to skip)')
+    parser.add_argument('--skip-pipeline', action='store_true',
+                       help='Only run the analyzer benchmarks')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                       help='Where to write the JSON report')
+    parser.add_argument('--baseline', type=str,
+                       help='Earlier JSON report to check for throughput regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                       help='Allowed throughput drop against --baseline (default: 0.10)')
+    
+    args = parser.parse_args()
+    
+    corpus = generate_corpus(
+        args.corpus_dir, num_files=args.num_files, distribution=args.duration_dist,
+        mean_duration=args.mean_duration, min_duration=args.min_duration,
+        max_duration=args.max_duration, sample_rate=args.sample_rate,
+        audio_format=args.format, seed=args.seed,
+    )
+    file_paths = corpus['files']
+    
+    config = load_config(args.config) if args.config else create_default_config()
+    # Every generated file should be analyzed, whatever the duration range
+    config['thresholds']['max_duration_sec'] = max(config['thresholds']['max_duration_sec'],
+                                                   args.max_duration)
+    
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'librosa': librosa.__version__,
+            'soundfile': sf.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'corpus': {**corpus['params'], 'total_audio_sec': corpus['total_audio_sec']},
+        'config': config,
+    }
+    
+    if args.analyzer_files > 0:
+        print("\nBenchmarking analyzer metrics...")
+        report['analyzer'] = benchmark_analyzer(AudioFilterPipeline(config),
+                                                file_paths[:args.analyzer_files])
+    
+    if not args.skip_pipeline:
+        with tempfile.TemporaryDirectory(prefix='bench_output_') as work_dir:
+            report['pipeline'] = benchmark_pipeline(config, file_paths, corpus['total_audio_sec'],
+                                                    args.workers, work_dir)
+    
+    report['peak_rss_mb'] = peak_rss_mb()
+    
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print_report(report)
+    print(f"\nReport saved to {args.output}")
+    
+    if args.baseline:
+        regressions = compare_to_baseline(report, args.baseline, args.tolerance)
+        if regressions:
+            print("\nPerformance regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
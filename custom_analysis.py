@@ -1,11 +1,13 @@
-import pandas as pd
 import numpy as np
+from result_store import load_results
 
 
 def main():
-    results_path = 'demo_output/filtering_results.csv'
+    results_path = 'demo_output'
     
-    df = pd.read_csv(results_path)
+    df = load_results(results_path, columns=['is_accepted', 'quality_score', 'snr_db',
+                                             'silence_ratio', 'dynamic_range_db',
+                                             'rejection_reasons'])
     
     print("="*60)
     print("CUSTOM ANALYSIS BY SUYASH KHARE")
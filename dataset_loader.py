@@ -1,113 +1,388 @@
+import argparse
+import io
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from itertools import islice
 from pathlib import Path
-from datasets import load_dataset
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
 import soundfile as sf
 from tqdm import tqdm
 import json
+from audio_filter_pipeline import AudioFilterPipeline
+from result_store import json_safe
+from run_pipeline import load_config
 
 
-def download_indicvoices_subset(
-    output_dir: str = "data/indicvoices",
-    languages: list = None,
+DEFAULT_LANGUAGES = ['hindi', 'bengali', 'telugu', 'marathi', 'tamil',
+                     'gujarati', 'kannada', 'malayalam', 'punjabi', 'odia']
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.mp3', '.ogg')
+
+
+# Sources yield samples shaped like the hub's: an 'audio' dict holding
+# either a decoded 'array' and 'sampling_rate', encoded 'bytes', or a
+# 'path', plus 'language' and optionally 'text' and 'speaker_id'. Encoded
+# audio is decoded by the writer threads.
+
+def hub_source(dataset_name: str = "ai4bharat/IndicVoices", split: str = "train") -> Iterable[Dict]:
+    try:
+        from datasets import load_dataset
+    except ImportError:
+        raise RuntimeError("Downloading from the hub requires datasets (pip install datasets)")
+    
+    print("Loading IndicVoices dataset...")
+    print("Note: This may take a while on first run as data is downloaded.")
+    return load_dataset(dataset_name, split=split, streaming=True)
+
+
+def directory_source(source_dir: str) -> Iterator[Dict]:
+    # Audio files under <source_dir>/<language>/, in sorted order so that
+    # resumed runs see the same sequence
+    for path in sorted(Path(source_dir).rglob('*')):
+        if path.suffix.lower() in AUDIO_EXTENSIONS:
+            yield {'audio': {'path': str(path)}, 'language': path.parent.name}
+
+
+def parquet_source(source_path: str, batch_size: int = 64) -> Iterator[Dict]:
+    # Parquet shards in the hub's layout, with audio as {'bytes', 'path'}
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet sources require pyarrow (pip install pyarrow)")
+    
+    source_path = Path(source_path)
+    files = sorted(source_path.glob('*.parquet')) if source_path.is_dir() else [source_path]
+    for file in files:
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+
+
+def decode_sample_audio(audio: Dict) -> Tuple[np.ndarray, int]:
+    if audio.get('array') is not None:
+        return np.asarray(audio['array']), audio['sampling_rate']
+    if audio.get('bytes') is not None:
+        return sf.read(io.BytesIO(audio['bytes']), dtype='float32')
+    return sf.read(audio['path'], dtype='float32')
+
+
+def ingest_sample(sample: Dict, file_path: Path, pipeline: Optional[AudioFilterPipeline] = None,
+                  keep_rejected: bool = False) -> Optional[Dict]:
+    # With a pipeline, the decoded audio is scored in memory before anything
+    # is written; rejected samples are dropped (None) unless keep_rejected.
+    # Their metrics are added to the metadata row.
+    audio_array, sampling_rate = decode_sample_audio(sample['audio'])
+    row = {
+        'file_path': str(file_path),
+        'language': sample['language'].lower(),
+        'duration': len(audio_array) / sampling_rate,
+        'sample_rate': sampling_rate,
+        'text': sample.get('text', ''),
+        'speaker_id': sample.get('speaker_id', ''),
+    }
+    
+    if pipeline is not None:
+        result, _ = pipeline.process_decoded(str(file_path), audio_array, sampling_rate)
+        if not result.is_accepted and not keep_rejected:
+            return None
+        row.update((name, value) for name, value in asdict(result).items() 
+                   if name not in ('file_path', 'duration', 'sample_rate'))
+    
+    sf.write(file_path, audio_array, sampling_rate)
+    return row
+
+
+class IngestProgress:
+    # Resume point of an ingestion run: the number of source samples fully
+    # handled (written, dropped or skipped), the file names used and the
+    # samples accepted per language, and the manifest rows written. Saved
+    # atomically; anything after the last save is redone on resume under
+    # the same file names.
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.position = 0
+        self.language_counts: Dict[str, int] = {}
+        self.accepted_counts: Dict[str, int] = {}
+        self.manifest_rows = 0
+        if path.exists():
+            with open(path) as f:
+                state = json.load(f)
+            self.position = state['position']
+            self.language_counts = state['language_counts']
+            self.accepted_counts = state.get('accepted_counts', state['language_counts'])
+            self.manifest_rows = state['manifest_rows']
+    
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'position': self.position, 'language_counts': self.language_counts,
+                       'accepted_counts': self.accepted_counts,
+                       'manifest_rows': self.manifest_rows}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def _truncate_manifest(manifest_path: Path, rows: int):
+    # Drops rows appended after the last checkpoint
+    if not manifest_path.exists():
+        return
+    with open(manifest_path, 'r+', encoding='utf-8') as f:
+        for _ in range(rows):
+            if not f.readline():
+                break
+        f.truncate(f.tell())
+
+
+def ingest_dataset(
+    source: Iterable[Dict],
+    output_dir: str,
+    languages: Optional[List[str]] = None,
     max_samples_per_language: int = 500,
-    split: str = "train"
-):
+    num_writers: int = 4,
+    max_pending: int = 64,
+    checkpoint_every: int = 100,
+    resume: bool = True,
+    filter_config: Optional[Dict] = None,
+    keep_rejected: bool = False,
+) -> Tuple[List[str], List[Dict]]:
+    # Writes up to max_samples_per_language WAV files per language from
+    # source to <output_dir>/<language>/. Samples are decoded and written
+    # on num_writers threads with at most max_pending in flight; results
+    # are collected in source order, so metadata.jsonl is appended in that
+    # order and the checkpoint is a simple position in the source.
+    # With filter_config, samples are scored by the filtering pipeline as
+    # they arrive and the quota counts accepted samples only.
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
+    languages = languages or DEFAULT_LANGUAGES
     
-    print("Loading IndicVoices dataset...")
-    print("Note: This may take a while on first run as data is downloaded.")
+    manifest_path = output_path / "metadata.jsonl"
+    progress_path = output_path / "ingest_progress.json"
+    if not resume:
+        progress_path.unlink(missing_ok=True)
+        manifest_path.unlink(missing_ok=True)
     
-    dataset = load_dataset(
-        "ai4bharat/IndicVoices",
-        split=split,
-        streaming=True
-    )
+    progress = IngestProgress(progress_path)
+    _truncate_manifest(manifest_path, progress.manifest_rows)
+    language_counts = {lang: progress.language_counts.get(lang, 0) for lang in languages}
+    accepted_counts = {lang: progress.accepted_counts.get(lang, 0) for lang in languages}
+    if progress.position:
+        print(f"Resuming after {progress.position} source samples: "
+              f"{sum(accepted_counts.values())} samples already accepted")
+    
+    # Counts at dispatch name the files; done_counts trail them and are
+    # what a checkpoint records
+    done_counts = dict(language_counts)
+    in_flight = {lang: 0 for lang in languages}
+    samples = source.skip(progress.position) if hasattr(source, 'skip') else islice(source, progress.position, None)
+    pending = deque()
+    errors = dropped = 0
+    
+    # Pipelines keep per-file timing state, so each writer thread gets its
+    # own. Decoded arrays have no file to cache by.
+    local = threading.local()
     
-    if languages is None:
-        languages = ['hindi', 'bengali', 'telugu', 'marathi', 'tamil', 
-                    'gujarati', 'kannada', 'malayalam', 'punjabi', 'odia']
+    def process(sample: Dict, file_path: Path) -> Optional[Dict]:
+        pipeline = None
+        if filter_config is not None:
+            pipeline = getattr(local, 'pipeline', None)
+            if pipeline is None:
+                pipeline = local.pipeline = AudioFilterPipeline({**filter_config, 'cache': None})
+        return ingest_sample(sample, file_path, pipeline, keep_rejected)
     
-    language_counts = {lang: 0 for lang in languages}
-    audio_files = []
-    metadata = []
+    def quota_full(lang: str, count_in_flight: bool = True) -> bool:
+        return (accepted_counts[lang] + (in_flight[lang] if count_in_flight else 0) 
+                >= max_samples_per_language)
     
     print(f"\nDownloading up to {max_samples_per_language} samples per language...")
     
-    for idx, sample in enumerate(tqdm(dataset)):
-        if all(count >= max_samples_per_language for count in language_counts.values()):
-            break
+    with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+         ThreadPoolExecutor(max_workers=max(1, num_writers), thread_name_prefix='ingest') as executor:
         
-        lang = sample.get('language', '').lower()
+        def drain_oldest():
+            nonlocal errors, dropped
+            idx, lang, future = pending.popleft()
+            in_flight[lang] -= 1
+            done_counts[lang] += 1
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"\nError processing sample {idx}: {e}")
+                errors += 1
+                return
+            if row is not None:
+                manifest.write(json.dumps(json_safe(row), ensure_ascii=False, allow_nan=False) + "\n")
+                progress.manifest_rows += 1
+            if row is None or not row.get('is_accepted', True):
+                dropped += row is None
+                return
+            accepted_counts[lang] += 1
         
-        if lang not in languages or language_counts[lang] >= max_samples_per_language:
-            continue
+        def checkpoint(position: int):
+            manifest.flush()
+            os.fsync(manifest.fileno())
+            progress.position = position
+            progress.language_counts = dict(done_counts)
+            progress.accepted_counts = dict(accepted_counts)
+            progress.save()
         
-        try:
-            audio_data = sample['audio']
-            audio_array = audio_data['array']
-            sampling_rate = audio_data['sampling_rate']
+        position = progress.position
+        for idx, sample in enumerate(tqdm(samples, initial=position), start=position):
+            # Samples in flight may still fail or be rejected, so with every
+            # quota taken the outcome is awaited before reading further
+            while pending and all(quota_full(lang) for lang in languages):
+                drain_oldest()
+            if all(quota_full(lang, count_in_flight=False) for lang in languages):
+                break
+            position = idx + 1
             
-            lang_dir = output_path / lang
-            lang_dir.mkdir(exist_ok=True)
+            lang = (sample.get('language') or '').lower()
+            if lang in languages:
+                while pending and quota_full(lang) and not quota_full(lang, count_in_flight=False):
+                    drain_oldest()
             
-            file_name = f"{lang}_{language_counts[lang]:05d}.wav"
-            file_path = lang_dir / file_name
+            if lang in languages and not quota_full(lang):
+                lang_dir = output_path / lang
+                lang_dir.mkdir(exist_ok=True)
+                file_path = lang_dir / f"{lang}_{language_counts[lang]:05d}.wav"
+                pending.append((idx, lang, executor.submit(process, sample, file_path)))
+                language_counts[lang] += 1
+                in_flight[lang] += 1
             
-            sf.write(file_path, audio_array, sampling_rate)
-            
-            metadata.append({
-                'file_path': str(file_path),
-                'language': lang,
-                'duration': len(audio_array) / sampling_rate,
-                'sample_rate': sampling_rate,
-                'text': sample.get('text', ''),
-                'speaker_id': sample.get('speaker_id', ''),
-            })
-            
-            audio_files.append(str(file_path))
-            language_counts[lang] += 1
-            
-        except Exception as e:
-            print(f"\nError processing sample {idx}: {e}")
-            continue
+            while len(pending) > max_pending:
+                drain_oldest()
+            if position % checkpoint_every == 0:
+                checkpoint(pending[0][0] if pending else position)
+        
+        while pending:
+            drain_oldest()
+        checkpoint(position)
+    
+    # file_list.txt and metadata.json are rebuilt from the manifest, which
+    # also covers files written by earlier, interrupted runs
+    audio_files, metadata = [], []
+    with open(manifest_path, encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            # Manifests from earlier runs can hold NaN for skipped metrics
+            metadata.append(json_safe(row))
+            audio_files.append(row['file_path'])
     
     metadata_path = output_path / "metadata.json"
     with open(metadata_path, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
+        json.dump(metadata, f, indent=2, ensure_ascii=False, allow_nan=False)
     
     filelist_path = output_path / "file_list.txt"
     with open(filelist_path, 'w') as f:
         for file_path in audio_files:
             f.write(f"{file_path}\n")
     
+    written = {lang: 0 for lang in languages}
+    for row in metadata:
+        written[row['language']] = written.get(row['language'], 0) + 1
+    
     print("\n" + "="*60)
     print("DOWNLOAD SUMMARY")
     print("="*60)
     print(f"Total files downloaded: {len(audio_files)}")
+    if errors:
+        print(f"Failed samples: {errors}")
+    if filter_config is not None:
+        print(f"Accepted by the quality filter: {sum(accepted_counts.values())}")
+        if dropped:
+            print(f"Rejected and not saved (this run): {dropped}")
     print(f"Saved to: {output_path}")
     print(f"\nFiles per language:")
-    for lang, count in sorted(language_counts.items()):
+    for lang, count in sorted(written.items()):
         print(f"  {lang}: {count}")
-    print(f"\nMetadata saved to: {metadata_path}")
+    print(f"\nMetadata saved to: {metadata_path} (incremental: {manifest_path.name})")
     print(f"File list saved to: {filelist_path}")
     print("="*60)
     
     return audio_files, metadata
 
 
+def download_indicvoices_subset(
+    output_dir: str = "data/indicvoices",
+    languages: list = None,
+    max_samples_per_language: int = 500,
+    split: str = "train",
+    source: Optional[Iterable[Dict]] = None,
+    num_writers: int = 4,
+    resume: bool = True,
+    filter_config: Optional[Dict] = None,
+    keep_rejected: bool = False,
+):
+    # source replaces the hub stream, e.g. directory_source() or
+    # parquet_source() for offline runs
+    if source is None:
+        source = hub_source(split=split)
+    return ingest_dataset(source, output_dir, languages=languages,
+                          max_samples_per_language=max_samples_per_language,
+                          num_writers=num_writers, resume=resume,
+                          filter_config=filter_config, keep_rejected=keep_rejected)
+
+
 def load_file_list(file_list_path: str) -> list:
     with open(file_list_path, 'r') as f:
         return [line.strip() for line in f if line.strip()]
 
 
-if __name__ == "__main__":
-    audio_files, metadata = download_indicvoices_subset(
-        output_dir="data/indicvoices",
-        languages=['hindi', 'bengali', 'telugu', 'tamil', 'kannada'],
-        max_samples_per_language=200,
-        split="train"
+def main():
+    parser = argparse.ArgumentParser(description='Download a per-language subset of IndicVoices')
+    
+    parser.add_argument('--output-dir', type=str, default='data/indicvoices',
+                       help='Directory for the WAV files and metadata')
+    parser.add_argument('--languages', nargs='+',
+                       default=['hindi', 'bengali', 'telugu', 'tamil', 'kannada'],
+                       help='Languages to keep')
+    parser.add_argument('--max-per-language', type=int, default=200,
+                       help='Files written per language')
+    parser.add_argument('--split', type=str, default='train',
+                       help='Dataset split to stream from the hub')
+    parser.add_argument('--source-dir', type=str,
+                       help='Read <dir>/<language>/ audio files instead of the hub')
+    parser.add_argument('--source-parquet', type=str,
+                       help='Read a parquet shard (or directory of shards) instead of the hub')
+    parser.add_argument('--writers', type=int, default=4,
+                       help='Threads decoding and writing samples')
+    parser.add_argument('--restart', action='store_true',
+                       help='Ignore the saved progress and start from the beginning')
+    parser.add_argument('--filter', action='store_true',
+                       help='Score samples in memory and save only those the quality filter accepts')
+    parser.add_argument('--filter-config', type=str,
+                       help='Pipeline configuration JSON file for --filter')
+    parser.add_argument('--keep-rejected', action='store_true',
+                       help='With --filter, also save rejected samples (metrics are in the metadata)')
+    
+    args = parser.parse_args()
+    
+    source = None
+    if args.source_dir:
+        source = directory_source(args.source_dir)
+    elif args.source_parquet:
+        source = parquet_source(args.source_parquet)
+    
+    download_indicvoices_subset(
+        output_dir=args.output_dir,
+        languages=args.languages,
+        max_samples_per_language=args.max_per_language,
+        split=args.split,
+        source=source,
+        num_writers=args.writers,
+        resume=not args.restart,
+        filter_config=load_config(args.filter_config) if args.filter or args.filter_config else None,
+        keep_rejected=args.keep_rejected,
     )
     
     print(f"\nDataset ready for processing")
-    print(f"Use the file list at: data/indicvoices/file_list.txt")
+    print(f"Use the file list at: {args.output_dir}/file_list.txt")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,49 @@ import json
 from audio_filter_pipeline import AudioFilterPipeline, create_default_config
 
 
+SAMPLE_TYPES = ["good_quality", "noisy", "silent", "clipped"]
+
+SAMPLE_PROFILES = {
+    "good_quality": {'duration': 5.0, 'snr_db': 20, 'silence_ratio': 0.2},
+    "noisy": {'duration': 4.0, 'snr_db': 5, 'silence_ratio': 0.15},
+    "silent": {'duration': 6.0, 'snr_db': 15, 'silence_ratio': 0.6},
+    "clipped": {'duration': 3.0, 'snr_db': 18, 'silence_ratio': 0.1},
+}
+
+
+def synthesize_sample(sample_type: str, duration: float, sr: int = 16000, rng=np.random) -> np.ndarray:
+    snr_db = SAMPLE_PROFILES[sample_type]['snr_db']
+    
+    t = np.linspace(0, duration, int(sr * duration))
+    
+    signal = (
+        0.3 * np.sin(2 * np.pi * 200 * t) +
+        0.2 * np.sin(2 * np.pi * 400 * t) +
+        0.1 * np.sin(2 * np.pi * 800 * t)
+    )
+    
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    signal = signal * envelope
+    
+    if sample_type == "noisy":
+        noise_power = 10 ** (-snr_db / 20)
+        noise = rng.normal(0, noise_power, len(signal))
+        signal = signal + noise
+    
+    if sample_type == "silent":
+        silent_sections = int(len(signal) * 0.5)
+        signal[:silent_sections] = 0
+    
+    if sample_type == "clipped":
+        signal = signal * 2.0
+        signal = np.clip(signal, -1.0, 1.0)
+    
+    if sample_type != "clipped":
+        signal = signal / (np.max(np.abs(signal)) + 0.01) * 0.8
+    
+    return signal
+
+
 def generate_sample_audio_files(output_dir: str = "demo_data", num_samples: int = 20):
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -16,53 +59,9 @@ def generate_sample_audio_files(output_dir: str = "demo_data", num_samples: int
     audio_files = []
     
     for i in range(num_samples):
-        if i % 4 == 0:
-            duration = 5.0
-            snr_db = 20
-            silence_ratio = 0.2
-            sample_type = "good_quality"
-        elif i % 4 == 1:
-            duration = 4.0
-            snr_db = 5
-            silence_ratio = 0.15
-            sample_type = "noisy"
-        elif i % 4 == 2:
-            duration = 6.0
-            snr_db = 15
-            silence_ratio = 0.6
-            sample_type = "silent"
-        else:
-            duration = 3.0
-            snr_db = 18
-            silence_ratio = 0.1
-            sample_type = "clipped"
-        
-        t = np.linspace(0, duration, int(sr * duration))
-        
-        signal = (
-            0.3 * np.sin(2 * np.pi * 200 * t) +
-            0.2 * np.sin(2 * np.pi * 400 * t) +
-            0.1 * np.sin(2 * np.pi * 800 * t)
-        )
-        
-        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
-        signal = signal * envelope
-        
-        if sample_type == "noisy":
-            noise_power = 10 ** (-snr_db / 20)
-            noise = np.random.normal(0, noise_power, len(signal))
-            signal = signal + noise
-        
-        if sample_type == "silent":
-            silent_sections = int(len(signal) * 0.5)
-            signal[:silent_sections] = 0
-        
-        if sample_type == "clipped":
-            signal = signal * 2.0
-            signal = np.clip(signal, -1.0, 1.0)
-        
-        if sample_type != "clipped":
-            signal = signal / (np.max(np.abs(signal)) + 0.01) * 0.8
+        sample_type = SAMPLE_TYPES[i % 4]
+        duration = SAMPLE_PROFILES[sample_type]['duration']
+        signal = synthesize_sample(sample_type, duration, sr)
         
         file_path = output_path / f"sample_{i:03d}_{sample_type}.wav"
         sf.write(file_path, signal, sr)
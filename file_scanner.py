@@ -0,0 +1,112 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+INDEX_VERSION = 1
+
+
+class FileScanner:
+    # Finds files under root whose names end in one of suffixes, in a single
+    # pass of os.scandir calls spread over a thread pool, one directory per
+    # task. Files are yielded as each directory is listed, so consumers can
+    # start before the walk ends, in no particular order.
+    #
+    # With index_path, each directory's modification time, matching files
+    # (with size and mtime) and subdirectories are saved after a complete
+    # walk. Later walks only stat a directory whose mtime is unchanged and
+    # list it from the index; adding, removing or renaming entries changes a
+    # directory's mtime, but rewriting a file in place does not, so sizes
+    # and mtimes of such files can be stale.
+    
+    def __init__(self, root: str, suffixes: Iterable[str], threads: int = 8,
+                 index_path: Optional[str] = None):
+        self.root = str(Path(root))
+        self.suffixes = tuple(sorted(suffixes))
+        self.threads = max(1, threads)
+        self.index_path = index_path
+        self.dirs: Dict[str, Dict] = {}
+        self.files_found = 0
+        self.dirs_listed = 0
+        self.dirs_reused = 0
+        self.previous = self.load_index()
+    
+    def load_index(self) -> Dict[str, Dict]:
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (index.get('version') != INDEX_VERSION or index.get('root') != os.path.abspath(self.root) or
+                tuple(index.get('suffixes', ())) != self.suffixes):
+            return {}
+        return index['dirs']
+    
+    def save_index(self):
+        index = {
+            'version': INDEX_VERSION,
+            'root': os.path.abspath(self.root),
+            'suffixes': list(self.suffixes),
+            'dirs': self.dirs,
+        }
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def _scan_dir(self, rel_dir: str) -> Tuple[str, Optional[Dict], bool]:
+        # None for directories that vanished or cannot be read, which are
+        # skipped as rglob skips them
+        path = os.path.join(self.root, rel_dir)
+        try:
+            # Taken before listing, so a change during the listing shows up
+            # as a changed directory next time
+            mtime_ns = os.stat(path).st_mtime_ns
+            known = self.previous.get(rel_dir)
+            if known is not None and known['mtime_ns'] == mtime_ns:
+                return rel_dir, known, True
+            
+            files, subdirs = {}, []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.name.endswith(self.suffixes) and entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            return rel_dir, None, False
+        return rel_dir, {'mtime_ns': mtime_ns, 'files': files, 'dirs': subdirs}, False
+    
+    def __iter__(self) -> Iterator[str]:
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='scan')
+        pending = {executor.submit(self._scan_dir, '')}
+        completed = False
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rel_dir, listing, reused = future.result()
+                    if listing is None:
+                        continue
+                    self.dirs[rel_dir] = listing
+                    if reused:
+                        self.dirs_reused += 1
+                    else:
+                        self.dirs_listed += 1
+                    for name in listing['dirs']:
+                        pending.add(executor.submit(self._scan_dir, os.path.join(rel_dir, name)))
+                    for name in listing['files']:
+                        self.files_found += 1
+                        yield os.path.join(self.root, rel_dir, name)
+            completed = True
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        # Only a complete walk replaces the index
+        if completed and self.index_path:
+            self.save_index()
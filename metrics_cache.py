@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from archive_reader import split_member_path
+
+
+class MetricsCache:
+    # On-disk store of raw analyzer output, so re-runs with new thresholds or
+    # weights only decode files that are new or changed. Entries are keyed by
+    # file identity plus analyzer version, sample rate and the decode variant
+    # (resampler), and evicted least recently used once the store grows past
+    # max_size_mb.
+
+    EVICT_EVERY = 256
+
+    def __init__(self, cache_dir: str, analyzer_version: str, sample_rate: int,
+                 max_size_mb: float = 1024, key_mode: str = 'stat'):
+        if key_mode not in ('stat', 'content'):
+            raise ValueError(f"Unknown cache key mode: {key_mode}")
+
+        self.cache_dir = Path(cache_dir)
+        self.db_path = self.cache_dir / "metrics_cache.sqlite"
+        self.analyzer_version = analyzer_version
+        self.sample_rate = sample_rate
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.key_mode = key_mode
+        self._conn = None
+        self._writes = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS metrics ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS metrics_last_access ON metrics (last_access)"
+            )
+        return self._conn
+
+    def file_key(self, file_path: str, data: Optional[bytes] = None, variant: str = '') -> str:
+        # data, if the file has already been read, saves re-reading it for
+        # the content hash. variant names any other setting the metrics
+        # depend on, such as the resampler.
+        if self.key_mode == 'content':
+            digest = hashlib.blake2b(digest_size=20)
+            if data is not None:
+                digest.update(data)
+            else:
+                with open(file_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(chunk)
+            identity = f"content:{digest.hexdigest()}"
+        else:
+            # Archive members are identified by the archive's stat and name
+            archive_path, member = split_member_path(file_path)
+            stat = os.stat(archive_path)
+            identity = f"stat:{os.path.abspath(archive_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+            if member is not None:
+                identity += f":{member}"
+
+        key = f"{identity}|v{self.analyzer_version}|sr{self.sample_rate}|{variant}"
+        return hashlib.blake2b(key.encode(), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT payload FROM metrics WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self.conn.execute(
+            "UPDATE metrics SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        return json.loads(row[0])
+
+    def put(self, key: str, entry: Dict):
+        payload = json.dumps(entry)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO metrics (key, payload, size, last_access) "
+            "VALUES (?, ?, ?, ?)",
+            (key, payload, len(payload), time.time())
+        )
+
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def total_size(self) -> int:
+        row = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM metrics").fetchone()
+        return int(row[0])
+
+    def evict(self):
+        excess = self.total_size() - self.max_size_bytes
+        if excess <= 0:
+            return
+
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM metrics ORDER BY last_access ASC"
+        ):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+
+        self.conn.executemany("DELETE FROM metrics WHERE key = ?", stale)
+
+    def close(self):
+        if self._conn is not None:
+            self.evict()
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,58 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+from profiling import NULL_TIMER
+
+
+class Prefetcher:
+    # Reads upcoming files into memory on a small thread pool, so waiting on
+    # slow storage overlaps with analysis of the current file. At most
+    # max_files reads are in flight or buffered and no more reads start
+    # while max_bytes are held. Files over max_file_bytes, or that fail to
+    # read, come back as None and are read from disk by the consumer.
+    
+    def __init__(self, file_paths: Iterable[str], threads: int = 2, max_files: int = 8,
+                 max_bytes: int = 64 << 20, max_file_bytes: int = 32 << 20, timer=NULL_TIMER):
+        self.file_paths = file_paths
+        self.threads = max(1, threads)
+        self.max_files = max(1, max_files)
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.timer = timer
+    
+    def _read(self, file_path: str) -> Optional[bytes]:
+        try:
+            if os.path.getsize(file_path) > self.max_file_bytes:
+                return None
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def __iter__(self) -> Iterator[Tuple[str, Optional[bytes]]]:
+        paths = iter(self.file_paths)
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='prefetch')
+        
+        def held_bytes() -> int:
+            return sum(len(future.result() or b'') for _, future in pending if future.done())
+        
+        def fill():
+            while len(pending) < self.max_files and held_bytes() < self.max_bytes:
+                path = next(paths, None)
+                if path is None:
+                    return
+                pending.append((path, executor.submit(self._read, path)))
+        
+        try:
+            fill()
+            while pending:
+                path, future = pending.popleft()
+                with self.timer.stage('io_wait'):
+                    data = future.result()
+                fill()
+                yield path, data
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,189 @@
+import heapq
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+
+import numpy as np
+
+
+# Log-spaced wall time bins from 10 us to 1000 s, four per decade
+HISTOGRAM_EDGES = np.logspace(-5, 3, 33)
+
+
+class StageTimer:
+    # Wall (and optionally CPU) time per named stage of the file currently
+    # being processed. take() hands the stages over and starts a new file.
+    
+    def __init__(self, cpu: bool = False):
+        self.cpu = cpu
+        self.current: Dict[str, List[float]] = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        wall = time.perf_counter()
+        cpu = time.process_time() if self.cpu else 0.0
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall,
+                     time.process_time() - cpu if self.cpu else 0.0)
+    
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        totals = self.current.get(name)
+        if totals is None:
+            self.current[name] = [wall, cpu]
+        else:
+            totals[0] += wall
+            totals[1] += cpu
+    
+    def take(self) -> Dict[str, List[float]]:
+        current, self.current = self.current, {}
+        return current
+
+
+class NullTimer:
+    # Stand-in when detailed profiling is off; stages cost one method call
+    
+    _context = nullcontext()
+    
+    def stage(self, name: str):
+        return self._context
+    
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        pass
+    
+    def take(self) -> Dict[str, List[float]]:
+        return {}
+
+
+NULL_TIMER = NullTimer()
+
+
+class StageStats:
+    # Per-stage totals across files. With detailed=True it also keeps wall
+    # time histograms, the per-file records and the slowest files; stats
+    # from different workers are combined with merge().
+    
+    def __init__(self, detailed: bool = False, keep_slowest: int = 0):
+        self.detailed = detailed
+        self.keep_slowest = keep_slowest
+        self.files = 0
+        self.totals: Dict[str, List[float]] = {}
+        self.histograms: Dict[str, np.ndarray] = {}
+        self.records: List[Dict] = []
+        self.slowest: List = []
+    
+    def add_file(self, file_path: str, stages: Dict[str, List[float]]):
+        self.files += 1
+        for name, (wall, cpu) in stages.items():
+            totals = self.totals.setdefault(name, [0.0, 0.0, 0, 0.0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += 1
+            totals[3] = max(totals[3], wall)
+        
+        if not self.detailed:
+            return
+        
+        for name, (wall, _) in stages.items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = np.zeros(len(HISTOGRAM_EDGES) + 1, dtype=np.int64)
+            histogram[np.searchsorted(HISTOGRAM_EDGES, wall)] += 1
+        
+        record = {'file_path': file_path,
+                  'stages': {name: {'wall_sec': wall, 'cpu_sec': cpu}
+                             for name, (wall, cpu) in stages.items()}}
+        self.records.append(record)
+        
+        if self.keep_slowest:
+            entry = (stages.get('total', [0.0])[0], file_path)
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+    
+    def merge(self, other: 'StageStats'):
+        self.files += other.files
+        for name, (wall, cpu, count, longest) in other.totals.items():
+            totals = self.totals.setdefault(name, [0.0, 0.0, 0, 0.0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += count
+            totals[3] = max(totals[3], longest)
+        
+        for name, histogram in other.histograms.items():
+            if name in self.histograms:
+                self.histograms[name] += histogram
+            else:
+                self.histograms[name] = histogram.copy()
+        
+        self.records.extend(other.records)
+        for entry in other.slowest:
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif self.keep_slowest:
+                heapq.heappushpop(self.slowest, entry)
+    
+    def take_records(self) -> List[Dict]:
+        records, self.records = self.records, []
+        return records
+    
+    def wall(self, name: str) -> float:
+        return self.totals.get(name, [0.0])[0]
+    
+    def slowest_files(self) -> List[str]:
+        return [path for _, path in sorted(self.slowest, reverse=True)]
+    
+    def to_dict(self) -> Dict:
+        # Histogram bin i counts files with wall time in
+        # [edges[i-1], edges[i]); the first and last bins are open-ended
+        stages = {}
+        for name, (wall, cpu, count, longest) in self.totals.items():
+            stages[name] = {
+                'files': count,
+                'wall_sec': wall,
+                'cpu_sec': cpu,
+                'mean_wall_sec': wall / count if count else 0.0,
+                'max_wall_sec': longest,
+            }
+            if name in self.histograms:
+                stages[name]['histogram'] = self.histograms[name].tolist()
+        
+        return {
+            'files': self.files,
+            'histogram_edges_sec': HISTOGRAM_EDGES.tolist(),
+            'stages': stages,
+            'slowest': [{'file_path': path, 'wall_sec': wall}
+                        for wall, path in sorted(self.slowest, reverse=True)],
+        }
+
+
+def profile_call(profiler: str, output_path: str, func, *args):
+    # Runs func(*args) under a profiler and writes its report to output_path
+    # (a .prof file for cProfile, .html for pyinstrument)
+    if profiler == 'cprofile':
+        import cProfile
+        
+        prof = cProfile.Profile()
+        try:
+            return prof.runcall(func, *args)
+        finally:
+            prof.dump_stats(output_path)
+    
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("The pyinstrument profiler requires pyinstrument (pip install pyinstrument)")
+        
+        prof = Profiler()
+        prof.start()
+        try:
+            return func(*args)
+        finally:
+            prof.stop()
+            with open(output_path, 'w') as f:
+                f.write(prof.output_html())
+    
+    raise ValueError(f"Unknown profiler: {profiler}")
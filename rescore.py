@@ -0,0 +1,159 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from audio_filter_pipeline import AudioFilterPipeline, BatchScores, RejectionReason
+from result_store import ParquetResultWriter, json_safe, load_results, remove_unselected_results
+from run_pipeline import load_config, save_config
+
+
+UNANALYZED_PREFIXES = ('Too short', 'Too long', 'Processing error')
+
+
+def rescore_results(pipeline: AudioFilterPipeline, df: pd.DataFrame) -> Tuple[pd.DataFrame, BatchScores]:
+    # Rows rejected on duration or by a processing error never had metrics
+    # computed, so they can only be re-checked against the duration range.
+    previous = df['rejection_reasons']
+    errored = previous.str.startswith('Processing error').to_numpy()
+    analyzed = ~previous.str.startswith(UNANALYZED_PREFIXES).to_numpy()
+
+    batch = pipeline.score_batch(df, check_duration=True)
+
+    duration_flags = RejectionReason.TOO_SHORT | RejectionReason.TOO_LONG
+    in_range = (batch.rejection_mask & duration_flags) == 0
+    batch.reject(~analyzed & ~errored & in_range, RejectionReason.NOT_ANALYZED)
+
+    # Early-exit rows lack the skipped metrics: they stay rejected only while
+    # a computed metric still fails, and never get a score
+    if 'analysis_tier' in df.columns:
+        partial = (df['analysis_tier'] == 'early_exit').to_numpy()
+        batch.quality_score[partial] = 0.0
+        batch.reject(partial & batch.is_accepted, RejectionReason.INCOMPLETE)
+
+    error_rows = np.flatnonzero(errored)
+    batch.reject(error_rows, RejectionReason.PROCESSING_ERROR,
+                 details={int(idx): previous.iat[idx].split('; ') for idx in error_rows})
+
+    df = df.drop(columns='rejection_mask', errors='ignore')
+    df = df.assign(quality_score=batch.quality_score, is_accepted=batch.is_accepted)
+    return df, batch
+
+
+def save_rescored(df: pd.DataFrame, batch: BatchScores, output_path: str,
+                  formats: Tuple[str, ...] = ('csv', 'json')):
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    rejected_rows = np.flatnonzero(~batch.is_accepted)
+    reasons = np.full(len(df), '', dtype=object)
+    reasons[rejected_rows] = ['; '.join(batch.reasons(idx)) for idx in rejected_rows]
+    df = df.assign(rejection_reasons=reasons)
+    remove_unselected_results(output_path, formats)
+
+    if 'csv' in formats:
+        df.to_csv(output_path / "filtering_results.csv", index=False, lineterminator="\r\n")
+
+    if 'json' in formats or 'parquet' in formats:
+        records = df.to_dict(orient='records')
+        for record in records:
+            record['rejection_reasons'] = record['rejection_reasons'].split('; ') if record['rejection_reasons'] else []
+
+    if 'json' in formats:
+        with open(output_path / "filtering_results.json", 'w') as f:
+            json.dump([json_safe(record) for record in records], f, indent=2, allow_nan=False)
+
+    if 'parquet' in formats:
+        writer = ParquetResultWriter(output_path / "filtering_results.parquet")
+        for record, mask in zip(records, batch.rejection_mask):
+            writer.write({**record, 'rejection_mask': int(mask)})
+        writer.close()
+
+    accepted = batch.is_accepted
+    with open(output_path / "accepted_files.txt", 'w') as f:
+        f.writelines(f"{path}\n" for path in df['file_path'][accepted])
+
+    with open(output_path / "rejected_files.txt", 'w') as f:
+        f.writelines(
+            f"{path}\t{reason}\n"
+            for path, reason in zip(df['file_path'].to_numpy()[rejected_rows], reasons[rejected_rows])
+        )
+
+    print(f"\nResults saved to {output_path}/")
+
+
+def print_rescore_summary(batch: BatchScores):
+    total = len(batch)
+    accepted = int(batch.is_accepted.sum())
+    rejected = total - accepted
+
+    print("\n" + "="*60)
+    print("RESCORING SUMMARY")
+    print("="*60)
+    print(f"Total files rescored: {total}")
+    print(f"Accepted: {accepted} ({accepted/total*100:.1f}%)")
+    print(f"Rejected: {rejected} ({rejected/total*100:.1f}%)")
+
+    if rejected > 0:
+        print("\nRejection reasons breakdown:")
+        for reason, count in sorted(batch.reason_counts().items(), key=lambda x: x[1], reverse=True):
+            print(f"  {reason}: {count} ({count/rejected*100:.1f}%)")
+
+    scores = batch.quality_score
+    print(f"\nQuality Score Statistics:")
+    print(f"  Mean: {np.mean(scores):.2f}")
+    print(f"  Median: {np.median(scores):.2f}")
+    print(f"  Std Dev: {np.std(scores):.2f}")
+    print(f"  Min: {np.min(scores):.2f}")
+    print(f"  Max: {np.max(scores):.2f}")
+    print("="*60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Re-apply thresholds and weights to existing filtering results without decoding audio')
+
+    parser.add_argument('results', type=str,
+                       help='Results directory or filtering_results.csv/.json file')
+    parser.add_argument('--config', type=str,
+                       help='Path to configuration JSON file')
+    parser.add_argument('--output-dir', type=str, required=True,
+                       help='Output directory for rescored results')
+    parser.add_argument('--min-snr', type=float,
+                       help='Minimum SNR in dB (override config)')
+    parser.add_argument('--max-silence', type=float,
+                       help='Maximum silence ratio 0-1 (override config)')
+    parser.add_argument('--max-clipping', type=float,
+                       help='Maximum clipping ratio 0-1 (override config)')
+
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+
+    if args.min_snr is not None:
+        config['thresholds']['min_snr_db'] = args.min_snr
+    if args.max_silence is not None:
+        config['thresholds']['max_silence_ratio'] = args.max_silence
+    if args.max_clipping is not None:
+        config['thresholds']['max_clipping_ratio'] = args.max_clipping
+
+    df = load_results(args.results)
+    print(f"\nLoaded {len(df)} results from {args.results}")
+
+    pipeline = AudioFilterPipeline(config)
+    rescored, batch = rescore_results(pipeline, df)
+
+    output_path = Path(args.output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    save_config(config, output_path / "config.json")
+
+    save_rescored(rescored, batch, output_path,
+                  formats=tuple(config.get('output_formats', ['csv', 'json'])))
+    print_rescore_summary(batch)
+
+
+if __name__ == "__main__":
+    main()
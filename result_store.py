@@ -0,0 +1,227 @@
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+
+
+SHARD_PATTERN = "results-*.jsonl"
+RESULT_FILES = {
+    'csv': "filtering_results.csv",
+    'json': "filtering_results.json",
+    'parquet': "filtering_results.parquet",
+}
+
+
+class ResultWriter:
+    # Append-only JSONL shards of per-file results. Rows are flushed and
+    # fsynced every flush_every rows or flush_interval seconds, so a crash
+    # loses at most the last unsynced batch; resume picks up the completed
+    # rows and starts a fresh shard for new ones.
+
+    def __init__(self, shard_dir: str, resume: bool = False, flush_every: int = 1000,
+                 flush_interval: float = 30.0, rows_per_shard: int = 100000):
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.rows_per_shard = rows_per_shard
+        # Paths checkpointed by earlier runs, only loaded on resume; rows
+        # written by this run are not tracked, so memory stays flat
+        self.completed: Set[str] = set()
+
+        existing = sorted(self.shard_dir.glob(SHARD_PATTERN))
+        if resume:
+            for shard in existing:
+                self.completed.update(row['file_path'] for row in read_shard(shard, repair=True))
+            self._next_index = len(existing)
+        else:
+            for shard in existing:
+                shard.unlink()
+            self._next_index = 0
+
+        self._file = None
+        self._rows_in_shard = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _open_shard(self):
+        path = self.shard_dir / f"results-{self._next_index:05d}.jsonl"
+        self._next_index += 1
+        self._file = open(path, 'a', encoding='utf-8')
+        self._rows_in_shard = 0
+
+    def write(self, row: Dict):
+        if self._file is None or self._rows_in_shard >= self.rows_per_shard:
+            self._close_shard()
+            self._open_shard()
+
+        self._file.write(json.dumps(row) + "\n")
+        self._rows_in_shard += 1
+        self._unsynced += 1
+
+        if (self._unsynced >= self.flush_every or
+                time.monotonic() - self._last_sync >= self.flush_interval):
+            self.sync()
+
+    def sync(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _close_shard(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._close_shard()
+
+    def iter_rows(self) -> Iterator[Dict]:
+        return iter_shards(self.shard_dir)
+
+
+def remove_unselected_results(output_path: str, formats: Iterable[str]):
+    # Results of formats not written this time would otherwise be left from
+    # an earlier run and picked up by load_results()
+    for fmt, name in RESULT_FILES.items():
+        if fmt not in formats:
+            (Path(output_path) / name).unlink(missing_ok=True)
+
+
+def json_safe(row: Dict) -> Dict:
+    # Metrics skipped by early exit or triage are NaN, which JSON has no
+    # token for; the JSON results carry them as null
+    return {key: None if isinstance(value, float) and math.isnan(value) else value
+            for key, value in row.items()}
+
+
+def read_shard(path: Path, repair: bool = False) -> Iterator[Dict]:
+    # A crash can leave a partially written last line; it is skipped, and
+    # with repair=True truncated away so later appends stay well-formed.
+    good_bytes = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            good_bytes += len(line)
+            yield row
+
+    if repair and good_bytes < path.stat().st_size:
+        with open(path, 'r+b') as f:
+            f.truncate(good_bytes)
+
+
+def iter_shards(shard_dir: str) -> Iterator[Dict]:
+    for shard in sorted(Path(shard_dir).glob(SHARD_PATTERN)):
+        yield from read_shard(shard)
+
+
+def _result_schema():
+    import pyarrow as pa
+
+    metric = pa.float64()
+    return pa.schema([
+        ('file_path', pa.string()),
+        ('duration', metric),
+        ('sample_rate', pa.int32()),
+        ('snr_db', metric),
+        ('silence_ratio', metric),
+        ('clipping_ratio', metric),
+        ('zero_crossing_rate', metric),
+        ('spectral_centroid_mean', metric),
+        ('spectral_rolloff_mean', metric),
+        ('rms_energy', metric),
+        ('dynamic_range_db', metric),
+        ('quality_score', metric),
+        ('is_accepted', pa.bool_()),
+        ('rejection_reasons', pa.list_(pa.string())),
+        ('rejection_mask', pa.uint16()),
+        ('analysis_tier', pa.string()),
+    ])
+
+
+class ParquetResultWriter:
+    # Typed, zstd-compressed Parquet output written one row group at a time,
+    # so only row_group_size rows are buffered in memory.
+
+    def __init__(self, path: str, row_group_size: int = 65536):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+
+        self.schema = _result_schema()
+        self.row_group_size = row_group_size
+        self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def write(self, row: Dict):
+        # Columns missing from older results are written as nulls
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+
+        if not self._buffered:
+            return
+        batch = pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+def _join_reasons(reasons) -> str:
+    if isinstance(reasons, str):
+        return reasons
+    if reasons is None or isinstance(reasons, float):
+        return ''
+    return '; '.join(reasons)
+
+
+def load_results(results_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    # Loads filtering results from a results directory or file, preferring
+    # Parquet. Only the requested columns are read; rejection_reasons comes
+    # back '; '-joined as in the CSV output.
+    path = Path(results_path)
+    if path.is_dir():
+        for name in ("filtering_results.parquet", "filtering_results.csv", "filtering_results.json"):
+            if (path / name).exists():
+                path = path / name
+                break
+
+    if path.suffix == '.parquet':
+        df = pd.read_parquet(path, columns=columns)
+    elif path.suffix == '.json':
+        with open(path, 'r') as f:
+            df = pd.DataFrame(json.load(f))
+        if columns is not None:
+            df = df[columns]
+    else:
+        df = pd.read_csv(path, usecols=columns, float_precision='round_trip')
+
+    if 'rejection_reasons' in df.columns:
+        df['rejection_reasons'] = df['rejection_reasons'].map(_join_reasons)
+    if 'is_accepted' in df.columns:
+        df['is_accepted'] = df['is_accepted'].astype(bool)
+    return df
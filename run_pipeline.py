@@ -1,7 +1,10 @@
 import argparse
 import json
+from itertools import chain
 from pathlib import Path
-from audio_filter_pipeline import AudioFilterPipeline, create_default_config
+from audio_filter_pipeline import AudioFilterPipeline, RESAMPLERS, create_default_config
+from file_scanner import FileScanner
+from sharding import iter_shard, select_shard, shard_output_dir, write_manifest
 
 
 def load_file_list(file_list_path: str) -> list:
@@ -28,6 +31,14 @@ def main():
                        help='Directory containing audio files')
     parser.add_argument('--file-list', type=str,
                        help='Text file with list of audio file paths')
+    parser.add_argument('--archives', action='store_true',
+                       help='Also read audio from tar/zip shards found in --dataset-dir')
+    parser.add_argument('--write-filtered-shards', action='store_true',
+                       help='Write copies of the input shards holding only accepted samples')
+    parser.add_argument('--scan-threads', type=int, default=8,
+                       help='Threads listing directories of --dataset-dir in parallel')
+    parser.add_argument('--file-index', type=str,
+                       help='Index of --dataset-dir saved by the previous run; only changed directories are re-listed')
     parser.add_argument('--config', type=str,
                        help='Path to configuration JSON file')
     parser.add_argument('--output-dir', type=str, default='output',
@@ -40,18 +51,68 @@ def main():
                        help='Maximum silence ratio 0-1 (override config)')
     parser.add_argument('--max-clipping', type=float,
                        help='Maximum clipping ratio 0-1 (override config)')
+    parser.add_argument('--output-formats', nargs='+', choices=['csv', 'json', 'parquet'],
+                       help='Result file formats to write (default: csv json)')
+    parser.add_argument('--chunk-size', type=int,
+                       help='Files dispatched to a worker per task (default: 32)')
+    parser.add_argument('--num-shards', type=int,
+                       help='Split the file list into N shards by path hash and process one of them')
+    parser.add_argument('--shard-index', type=int,
+                       help='Shard processed by this run, 0 to N-1 (with --num-shards)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Resume an interrupted run from the checkpoint shards in --output-dir')
+    parser.add_argument('--checkpoint-every', type=int,
+                       help='Flush and fsync checkpointed results every N files (default: 1000)')
+    parser.add_argument('--cache-dir', type=str,
+                       help='Directory for the persistent metrics cache')
+    parser.add_argument('--cache-max-mb', type=float,
+                       help='Size cap of the metrics cache in MB (default: 1024)')
+    parser.add_argument('--cache-key', choices=['stat', 'content'],
+                       help='Identify cached files by path/size/mtime or content hash')
+    parser.add_argument('--resampler', choices=list(RESAMPLERS),
+                       help='Resampler for files not at the target rate (default: soxr_hq)')
+    parser.add_argument('--profile', action='store_true',
+                       help='Record wall/CPU time per analysis stage and write profile.json')
+    parser.add_argument('--profile-slowest', type=int,
+                       help='With --profile, re-run the N slowest files under a profiler')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'],
+                       help='Profiler used for --profile-slowest (default: cprofile)')
+    parser.add_argument('--no-prefetch', action='store_true',
+                       help='Read each file only when its analysis starts')
+    parser.add_argument('--prefetch-threads', type=int,
+                       help='Reader threads per worker for prefetching files (default: 2)')
+    parser.add_argument('--decode-workers', type=int,
+                       help='Decode in a separate pool of N workers feeding a shared memory ring')
+    parser.add_argument('--ring-slots', type=int,
+                       help='Decoded files the ring holds between the pools (default: 16)')
+    parser.add_argument('--early-exit', action='store_true',
+                       help='Stop computing metrics once a file is certain to be rejected')
+    parser.add_argument('--triage', action='store_true',
+                       help='Decide clear accepts/rejects from sampled windows; analyze the rest fully')
+    parser.add_argument('--segment', action='store_true',
+                       help='Also split files at silences and accept/reject each segment')
+    parser.add_argument('--max-segment-sec', type=float,
+                       help='Longest segment emitted by --segment (default: 30)')
     
     args = parser.parse_args()
     
     file_paths = []
+    scanner = None
     
     if args.file_list:
         file_paths = load_file_list(args.file_list)
     elif args.dataset_dir:
-        dataset_path = Path(args.dataset_dir)
-        extensions = ['*.wav', '*.mp3', '*.flac', '*.ogg']
-        for ext in extensions:
-            file_paths.extend([str(p) for p in dataset_path.rglob(ext)])
+        # The scan runs alongside processing: files are dispatched to the
+        # workers as their directories are listed
+        extensions = ['.wav', '.mp3', '.flac', '.ogg']
+        if args.archives:
+            extensions += ['.tar', '.tar.gz', '.tgz', '.zip']
+        scanner = FileScanner(args.dataset_dir, extensions, threads=args.scan_threads,
+                              index_path=args.file_index)
+        found = iter(scanner)
+        first = next(found, None)
+        if first is not None:
+            file_paths = chain([first], found)
     else:
         parser.error("Must specify --dataset-dir or --file-list")
     
@@ -59,7 +120,27 @@ def main():
         print("Error: No audio files found")
         return
     
-    print(f"\nFound {len(file_paths)} audio files")
+    if scanner is None:
+        print(f"\nFound {len(file_paths)} audio files")
+    
+    output_dir = Path(args.output_dir)
+    total_files = len(file_paths) if scanner is None else None
+    shard_counts = {}
+    if args.num_shards:
+        if args.shard_index is None:
+            parser.error("--num-shards needs --shard-index")
+        try:
+            if scanner is None:
+                file_paths = select_shard(file_paths, args.shard_index, args.num_shards)
+            else:
+                file_paths = iter_shard(file_paths, args.shard_index, args.num_shards, shard_counts)
+        except ValueError as e:
+            parser.error(str(e))
+        output_dir = shard_output_dir(args.output_dir, args.shard_index, args.num_shards)
+        if scanner is None:
+            print(f"Shard {args.shard_index} of {args.num_shards}: {len(file_paths)} files")
+    elif args.shard_index is not None:
+        parser.error("--shard-index needs --num-shards")
     
     config = load_config(args.config)
     
@@ -70,20 +151,84 @@ def main():
     if args.max_clipping is not None:
         config['thresholds']['max_clipping_ratio'] = args.max_clipping
     
-    output_path = Path(args.output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    save_config(config, output_path / "config.json")
+    if args.output_formats:
+        config['output_formats'] = args.output_formats
+    if args.chunk_size is not None:
+        config['chunk_size'] = args.chunk_size
+    if args.checkpoint_every is not None:
+        config['checkpoint_every'] = args.checkpoint_every
+    
+    if args.cache_dir:
+        config.setdefault('cache', {})['dir'] = args.cache_dir
+    if args.cache_max_mb is not None:
+        config.setdefault('cache', {})['max_size_mb'] = args.cache_max_mb
+    if args.cache_key:
+        config.setdefault('cache', {})['key'] = args.cache_key
+    
+    if args.resampler:
+        config['resampler'] = args.resampler
+    
+    if args.profile:
+        config.setdefault('profiling', {})['enabled'] = True
+    if args.profile_slowest is not None:
+        config.setdefault('profiling', {})['profile_slowest'] = args.profile_slowest
+    if args.profiler:
+        config.setdefault('profiling', {})['profiler'] = args.profiler
+    
+    if args.no_prefetch:
+        config.setdefault('prefetch', {})['enabled'] = False
+    if args.prefetch_threads is not None:
+        config.setdefault('prefetch', {})['threads'] = args.prefetch_threads
+    
+    if args.decode_workers:
+        config.setdefault('decode_pool', {}).update(enabled=True, workers=args.decode_workers)
+    if args.ring_slots is not None:
+        config.setdefault('decode_pool', {})['ring_slots'] = args.ring_slots
+    
+    if args.write_filtered_shards:
+        config.setdefault('archives', {})['write_filtered'] = True
+    
+    if args.early_exit:
+        config['early_exit'] = True
+    if args.triage:
+        config.setdefault('triage', {})['enabled'] = True
+    
+    if args.segment:
+        config.setdefault('segmentation', {})['enabled'] = True
+    if args.max_segment_sec is not None:
+        config.setdefault('segmentation', {})['max_segment_sec'] = args.max_segment_sec
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    save_config(config, output_dir / "config.json")
+    if args.num_shards:
+        write_manifest(output_dir, args.shard_index, args.num_shards, 
+                       len(file_paths) if scanner is None else None, total_files)
     
     print("\nConfiguration:")
     print(json.dumps(config, indent=2))
     
     print(f"\nStarting filtering pipeline...")
     pipeline = AudioFilterPipeline(config)
-    results = pipeline.process_dataset(file_paths, args.output_dir, 
-                                      num_workers=args.num_workers)
+    pipeline.process_dataset(file_paths, str(output_dir), 
+                             num_workers=args.num_workers, resume=args.resume,
+                             collect_results=False)
+    
+    if scanner is not None:
+        print(f"\nFound {scanner.files_found} files in {scanner.dirs_listed + scanner.dirs_reused} directories" + 
+              (f" ({scanner.dirs_reused} unchanged since the last index)" if scanner.dirs_reused else ""))
+    
+    if args.num_shards:
+        num_files = len(file_paths) if scanner is None else shard_counts['selected']
+        total_files = total_files if scanner is None else shard_counts['total']
+        write_manifest(output_dir, args.shard_index, args.num_shards, num_files, total_files,
+                       completed=True)
     
     print(f"\nPipeline completed successfully")
-    print(f"Results saved to: {args.output_dir}/")
+    print(f"Results saved to: {output_dir}/")
+    if args.write_filtered_shards:
+        print(f"Filtered shards saved to: {output_dir}/filtered_shards/")
+    if args.num_shards:
+        print(f"Once every shard is done: python sharding.py merge {args.output_dir}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import argparse
+import json
+import zlib
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from audio_filter_pipeline import AudioFilterPipeline
+
+
+MANIFEST = "shard.json"
+
+
+def shard_of(file_path: str, num_shards: int) -> int:
+    # crc32 of the path as listed, so every node computes the same split
+    # whatever order it discovered the files in (hash() is salted per process)
+    return zlib.crc32(file_path.encode('utf-8')) % num_shards
+
+
+def check_shard_index(shard_index: int, num_shards: int):
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"Shard index {shard_index} is not in [0, {num_shards})")
+
+
+def select_shard(file_paths: List[str], shard_index: int, num_shards: int) -> List[str]:
+    check_shard_index(shard_index, num_shards)
+    return [path for path in file_paths if shard_of(path, num_shards) == shard_index]
+
+
+def iter_shard(file_paths: Iterable[str], shard_index: int, num_shards: int,
+               counts: Optional[Dict[str, int]] = None) -> Iterator[str]:
+    # Lazy select_shard for paths still being discovered; counts, if given,
+    # receives the number of paths seen ('total') and selected ('selected')
+    check_shard_index(shard_index, num_shards)
+    counts = counts if counts is not None else {}
+    counts.update(total=0, selected=0)
+    
+    def select():
+        for path in file_paths:
+            counts['total'] += 1
+            if shard_of(path, num_shards) == shard_index:
+                counts['selected'] += 1
+                yield path
+    
+    return select()
+
+
+def shard_output_dir(output_dir: str, shard_index: int, num_shards: int) -> Path:
+    return Path(output_dir) / f"shard-{shard_index:05d}-of-{num_shards:05d}"
+
+
+def write_manifest(shard_dir: Path, shard_index: int, num_shards: int, num_files: Optional[int],
+                   total_files: Optional[int], completed: bool = False):
+    # File counts are None until a streamed file list has been read to the end
+    manifest = {
+        'shard_index': shard_index,
+        'num_shards': num_shards,
+        'num_files': num_files,
+        'total_files': total_files,
+        'completed': completed,
+    }
+    with open(Path(shard_dir) / MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_config(shard_dir: Path) -> Dict:
+    with open(Path(shard_dir) / "config.json") as f:
+        return json.load(f)
+
+
+def find_shards(output_dir: str) -> List[Dict]:
+    manifests = []
+    for manifest_path in sorted(Path(output_dir).glob(f"shard-*-of-*/{MANIFEST}")):
+        with open(manifest_path) as f:
+            manifests.append({**json.load(f), 'dir': manifest_path.parent})
+    return manifests
+
+
+def check_shards(manifests: List[Dict]) -> List[str]:
+    if not manifests:
+        return ["No shard outputs found"]
+    
+    problems = []
+    counts = {manifest['num_shards'] for manifest in manifests}
+    if len(counts) > 1:
+        return [f"Shards from runs with different --num-shards: {sorted(counts)}"]
+    
+    num_shards = counts.pop()
+    present = {manifest['shard_index'] for manifest in manifests}
+    missing = sorted(set(range(num_shards)) - present)
+    if missing:
+        problems.append(f"Missing shards: {', '.join(map(str, missing))}")
+    
+    unfinished = [manifest['shard_index'] for manifest in manifests if not manifest['completed']]
+    if unfinished:
+        problems.append(f"Unfinished shards: {', '.join(map(str, unfinished))}")
+    return problems
+
+
+def merge_shards(output_dir: str, allow_partial: bool = False) -> bool:
+    # Builds the standard outputs in output_dir from the checkpointed rows
+    # of every shard, using the first shard's configuration
+    manifests = find_shards(output_dir)
+    problems = check_shards(manifests)
+    for problem in problems:
+        print(f"Error: {problem}" if not allow_partial else f"Warning: {problem}")
+    if not manifests or (problems and not allow_partial):
+        return False
+    
+    config = read_config(manifests[0]['dir'])
+    for manifest in manifests[1:]:
+        if read_config(manifest['dir']) != config:
+            print(f"Warning: {manifest['dir'].name} was run with a different configuration")
+    
+    pipeline = AudioFilterPipeline(config)
+    shard_dirs = [manifest['dir'] for manifest in manifests]
+    
+    def results():
+        return chain.from_iterable(pipeline.iter_checkpointed(shard_dir) for shard_dir in shard_dirs)
+    
+    print(f"Merging {len(shard_dirs)} shards "
+          f"({sum(manifest['num_files'] or 0 for manifest in manifests)} files)")
+    with open(Path(output_dir) / "config.json", 'w') as f:
+        json.dump(config, f, indent=2)
+    pipeline.save_results(results(), output_dir)
+    if pipeline.segmentation:
+        pipeline.save_segments(
+            chain.from_iterable(pipeline.iter_checkpointed_segments(shard_dir) for shard_dir in shard_dirs),
+            output_dir)
+    pipeline.print_summary(results())
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Combine the outputs of a sharded pipeline run')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    merge_parser = subparsers.add_parser('merge', help='Merge shard outputs into the standard results')
+    merge_parser.add_argument('output_dir', type=str,
+                              help='The --output-dir every shard was run with')
+    merge_parser.add_argument('--allow-partial', action='store_true',
+                              help='Merge even if shards are missing or unfinished')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'merge' and not merge_shards(args.output_dir, allow_partial=args.allow_partial):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class RingSlot:
+    index: int
+    n_samples: int
+    sample_rate: int
+
+
+class SharedRing:
+    # Fixed-size float32 slots in one memory-mapped file that every process
+    # maps, so decoded audio moves between processes as a slot index and the
+    # reader gets a NumPy view of the writer's samples. Free slot indices
+    # live in a queue: acquire() blocks until a reader release()s a slot,
+    # which caps the decoded audio waiting between stages at n_slots files.
+    
+    def __init__(self, path: str, n_slots: int, slot_samples: int, free_slots):
+        self.path = path
+        self.n_slots = n_slots
+        self.slot_samples = slot_samples
+        self.free_slots = free_slots
+        self._buffer = None
+    
+    @classmethod
+    def create(cls, n_slots: int, slot_samples: int, context=None) -> 'SharedRing':
+        # Backed by /dev/shm when it has room, so the pages never hit disk
+        size = n_slots * slot_samples * 4
+        directory = None
+        if os.path.isdir('/dev/shm') and shutil.disk_usage('/dev/shm').free > 2 * size:
+            directory = '/dev/shm'
+        fd, path = tempfile.mkstemp(prefix='audio_ring_', suffix='.f32', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.truncate(size)
+        
+        # The queue reaches workers through the pool initializer, which is
+        # the only way multiprocessing lets a queue be shared
+        free_slots = (context or multiprocessing.get_context()).Queue()
+        for index in range(n_slots):
+            free_slots.put(index)
+        return cls(path, n_slots, slot_samples, free_slots)
+    
+    def __getstate__(self):
+        # Each process maps the file itself
+        state = self.__dict__.copy()
+        state['_buffer'] = None
+        return state
+    
+    @property
+    def buffer(self) -> np.ndarray:
+        if self._buffer is None:
+            self._buffer = np.asarray(np.memmap(self.path, dtype=np.float32, mode='r+',
+                                                shape=(self.n_slots, self.slot_samples)))
+        return self._buffer
+    
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        # None when no slot freed up within timeout
+        try:
+            return self.free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def release(self, index: int):
+        self.free_slots.put(index)
+    
+    def view(self, slot: RingSlot) -> np.ndarray:
+        return self.buffer[slot.index, :slot.n_samples]
+    
+    def unlink(self):
+        self._buffer = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,24 +1,26 @@
-import pandas as pd
+from audio_filter_pipeline import AudioFilterPipeline, create_default_config
+from rescore import rescore_results
+from result_store import load_results
+from run_pipeline import load_config
 
 configs = {
-    "Default": {"min_snr_db": 10.0, "max_silence_ratio": 0.4},
-    "Strict": {"min_snr_db": 15.0, "max_silence_ratio": 0.3},
-    "Lenient": {"min_snr_db": 7.0, "max_silence_ratio": 0.5}
+    "Default": create_default_config(),
+    "Strict": load_config('configs/strict_quality.json'),
+    "Lenient": load_config('configs/lenient_noisy.json'),
 }
 
-df = pd.read_csv('demo_output/filtering_results.csv')
+df = load_results('demo_output')
 
 print("="*60)
 print("THRESHOLD SENSITIVITY ANALYSIS")
 print("="*60)
 
-for config_name, thresholds in configs.items():
-    accepted = df[
-        (df['snr_db'] >= thresholds['min_snr_db']) & 
-        (df['silence_ratio'] <= thresholds['max_silence_ratio'])
-    ]
+for config_name, config in configs.items():
+    rescored, _ = rescore_results(AudioFilterPipeline(config), df)
+    accepted = rescored[rescored['is_accepted']]
+    thresholds = config['thresholds']
     
-    acceptance_rate = len(accepted) / len(df) * 100
+    acceptance_rate = len(accepted) / len(rescored) * 100
     avg_score = accepted['quality_score'].mean() if len(accepted) > 0 else 0
     
     print(f"\n{config_name} Configuration:")
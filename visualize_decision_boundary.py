@@ -1,8 +1,8 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from result_store import load_results
 
-df = pd.read_csv('demo_output/filtering_results.csv')
+df = load_results('demo_output', columns=['snr_db', 'silence_ratio', 'quality_score', 'is_accepted'])
 
 fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 12))
 